@@ -0,0 +1,145 @@
+# Copyright 2021-2025
+# This file is part of HULK.
+#
+# HULK is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HULK is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HULK.  If not, see <http://www.gnu.org/licenses/>.
+#
+from typing import List
+import hashlib
+import llvmlite.binding as llvm
+import os
+import tempfile
+
+DEFAULT_LIMIT = 256 * 1024 * 1024
+ENTRY_SUFFIX = '.bc'
+
+_compiler: None | str = None
+
+def compiler_fingerprint () -> str:
+
+  global _compiler
+
+  if _compiler == None:
+
+    digest = hashlib.sha256 ()
+    root = os.path.dirname (os.path.dirname (os.path.abspath (__file__)))
+
+    for base, dirs, files in os.walk (root):
+
+      dirs [:] = sorted ([ name for name in dirs if name != '__pycache__' ])
+
+      for name in sorted (files):
+
+        if name.endswith ('.py'):
+
+          with open (path := os.path.join (base, name), 'rb') as stream:
+
+            digest.update (os.path.relpath (path, root).encode ('utf-8'))
+            digest.update (stream.read ())
+
+    digest.update ('.'.join (map (str, llvm.llvm_version_info)).encode ('utf-8'))
+
+    _compiler = digest.hexdigest ()
+
+  return _compiler
+
+class Cache:
+
+  def __init__ (self, directory: str, limit: int = DEFAULT_LIMIT) -> None:
+
+    self.directory = directory
+    self.limit = limit
+
+    os.makedirs (directory, exist_ok = True)
+
+  @staticmethod
+  def fingerprint (source: str, level: int, stdlib: List[str], budget: int) -> str:
+
+    digest = hashlib.sha256 ()
+
+    digest.update (compiler_fingerprint ().encode ('utf-8'))
+    digest.update (f'-O{level}'.encode ('utf-8'))
+    digest.update (f'--specialize={budget}'.encode ('utf-8'))
+
+    for file in stdlib:
+
+      with open (file, 'rb') as stream:
+
+        digest.update (hashlib.sha256 (stream.read ()).digest ())
+
+    digest.update (source.encode ('utf-8'))
+
+    return digest.hexdigest ()
+
+  def evict (self) -> None:
+
+    entries = [ ]
+    total = 0
+
+    for name in os.listdir (self.directory):
+
+      if name.endswith (ENTRY_SUFFIX):
+
+        try:
+
+          stat = os.stat (path := os.path.join (self.directory, name))
+        except FileNotFoundError:
+
+          continue
+
+        entries.append ((stat.st_mtime, stat.st_size, path))
+        total = total + stat.st_size
+
+    for _, size, path in sorted (entries):
+
+      if total <= self.limit:
+
+        break
+
+      try:
+
+        os.unlink (path)
+      except FileNotFoundError:
+
+        pass
+
+      total = total - size
+
+  def get (self, key: str) -> None | llvm.ModuleRef:
+
+    path = os.path.join (self.directory, key + ENTRY_SUFFIX)
+
+    try:
+
+      with open (path, 'rb') as stream:
+
+        module = llvm.parse_bitcode (stream.read ())
+    except (FileNotFoundError, RuntimeError):
+
+      return None
+
+    os.utime (path)
+
+    return module
+
+  def put (self, key: str, module: llvm.ModuleRef) -> None:
+
+    fd, temp = tempfile.mkstemp (dir = self.directory)
+
+    with os.fdopen (fd, 'wb') as stream:
+
+      stream.write (module.as_bitcode ())
+
+    os.replace (temp, os.path.join (self.directory, key + ENTRY_SUFFIX))
+
+    self.evict ()
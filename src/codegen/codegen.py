@@ -16,11 +16,14 @@
 #
 from codegen.collect import CollectStage
 from codegen.collect import CollectVisitor
+from codegen.collect import DEFAULT_BUDGET
+from codegen.escape import EscapeAnalysis, Flow
 from codegen.function import IRFunction
-from codegen.generate import GenerateVisitor
+from codegen.generate import GenerateVisitor, STRING_BUILDER
+from codegen.integer import IntegerVisitor
 from codegen.irframe import IRFrame
 from codegen.irtypes import IRTypes
-from codegen.type import IRType
+from codegen.type import ALLOCATOR, IRType, VTABLE_FIELD
 from codegen.value import IRReference
 from parser.ast.base import AstNode
 from semantic.check import Semantic
@@ -33,13 +36,19 @@ from utils.builtin import builtin_constants
 from utils.builtin import builtin_functions
 from utils.builtin import NUMBER_TYPE
 from utils.builtin import STRING_TYPE
+from utils.report import phase
 import llvmlite.ir as ir
 
 class Codegen:
 
-  def __init__(self) -> None:
+  def __init__(self, budget: int = DEFAULT_BUDGET) -> None:
 
-    pass
+    self.budget = budget
+
+  @staticmethod
+  def base_ctor ():
+
+    return CollectVisitor.mangleFunction ('.'.join ([ BASE_TYPE.name, CTOR_NAME ]), STDLIB_BASECTOR)
 
   @staticmethod
   def constant (module: ir.Module, name: str, type: ir.Type, value: Any):
@@ -61,12 +70,15 @@ class Codegen:
     types [STRING_TYPE.name] = ir.PointerType (ir.IntType (8))
 
     base_ctor_name = '.'.join ([ BASE_TYPE.name, CTOR_NAME ])
-    base_ctor_signature = CollectVisitor.mangleFunction (base_ctor_name, STDLIB_BASECTOR)
+    base_ctor_signature = Codegen.base_ctor ()
     base_ctor_ty = ir.FunctionType (basety, [ basety ])
     base_ctor = ir.Function (module, base_ctor_ty, base_ctor_signature)
 
     frame [base_ctor_name] = IRFunction (base_ctor_ty, base_ctor)
 
+    ir.Function (module, ir.FunctionType (ir.IntType (8).as_pointer (), [ ir.IntType (64) ]), ALLOCATOR)
+    ir.Function (module, ir.FunctionType (types [STRING_TYPE.name], [ ir.IntType (64), types [STRING_TYPE.name].as_pointer () ]), STRING_BUILDER)
+
     for name, (type_, value) in builtin_constants.items ():
 
       frame [name] = Codegen.constant (module, name, types [type_.name], value) # type: ignore
@@ -95,28 +107,42 @@ class Codegen:
 
       frame [type_.name] = first # type: ignore
 
-    basety.attributes = { '@type': ir.IntType (32) }
-    basety.complete (module)
+    basety.attributes = { '@type': ir.IntType (32), VTABLE_FIELD: ir.IntType (8).as_pointer () }
+    basety.complete (module, CollectVisitor.implementations (frame))
 
   def generate (self, ast: AstNode, semantic: Semantic, name: str = ''):
 
     builder = ir.IRBuilder ()
-    module = ir.Module (name)
+    module = ir.Module (name, context = ir.Context ())
 
     frame = IRFrame ()
     types = IRTypes ()
 
-    mainty = ir.FunctionType (ir.VoidType (), [])
+    mainty = ir.FunctionType (ir.IntType (32), [])
     main = ir.Function (module, mainty, 'main')
 
     builder.position_at_end (mainbb := main.append_basic_block ())
 
     Codegen.initialize (module, frame, types)
-    CollectVisitor (stage = CollectStage.COLLECT).visit (ast, module, semantic, frame, types) # type: ignore
-    CollectVisitor (stage = CollectStage.LINK).visit (ast, module, semantic, frame, types) # type: ignore
-    CollectVisitor (stage = CollectStage.COMPLETE).visit (ast, module, semantic, frame, types) # type: ignore
-    GenerateVisitor ().visit (ast, builder, frame, types) # type: ignore
 
-    builder.ret_void ()
+    for stage in [ CollectStage.COLLECT, CollectStage.LINK, CollectStage.COMPLETE ]:
+
+      with phase (str (stage)):
+
+        CollectVisitor (stage = stage, budget = self.budget).visit (ast, module, semantic, frame, types) # type: ignore
+
+    with phase ('IntegerVisitor'):
+
+      (integers := IntegerVisitor ()).visit (ast, { }, [ ]) # type: ignore
+
+    with phase ('GenerateVisitor'):
+
+      GenerateVisitor (integers).visit (ast, builder, frame, types) # type: ignore
+
+    builder.ret (ir.Constant (ir.IntType (32), 0))
+
+    with phase ('EscapeAnalysis'):
+
+      EscapeAnalysis (module, known = { Codegen.base_ctor (): [ Flow.RETURNED ] }).eliminate ()
 
     return module
@@ -18,7 +18,7 @@ from codegen.exception import CodegenException
 from codegen.function import IRFunction
 from codegen.irframe import IRFrame
 from codegen.irtypes import IRTypes
-from codegen.type import IRType
+from codegen.type import Implementations, IRType
 from enum import Enum
 from functools import reduce
 from parser.ast.base import AstNode
@@ -33,6 +33,8 @@ from utils.builtin import BASE_TYPE, CTOR_NAME
 import llvmlite.ir as ir
 import utils.visitor as visitor
 
+DEFAULT_BUDGET = 16
+
 class CollectStage (Enum):
 
   COLLECT = 1
@@ -41,10 +43,16 @@ class CollectStage (Enum):
 
 class CollectVisitor:
 
-  def __init__(self, stage: CollectStage) -> None:
+  def __init__(self, stage: CollectStage, budget: int = DEFAULT_BUDGET) -> None:
 
+    self.budget = budget
     self.stage = stage
 
+  @staticmethod
+  def implementations (frame: IRFrame) -> Implementations:
+
+    return lambda type_, name: [ func.function for func in frame ['.'.join ([ type_.name, name ])].candidates ] # type: ignore
+
   @staticmethod
   def irTypeFromType (type_: Type, types: IRTypes) -> ir.Type:
 
@@ -103,6 +111,8 @@ class CollectVisitor:
 
         assert (first := frame [name]) # type: ignore
 
+        lazy = len (prefix) == 0 and len ([ *first.candidates ]) > self.budget
+
         for alternative, func in zip (alternate (type_), first.candidates):
 
           funcn = CollectVisitor.mangleFunction (name, alternative) # type: ignore
@@ -127,7 +137,12 @@ class CollectVisitor:
 
               methods.append (func.type)
 
-          func._value = ir.Function (module, func.type, ''.join ([ funcn ]))
+          if lazy:
+
+            func.defer (lambda func, funcn = funcn: ir.Function (module, func.type, funcn))
+          else:
+
+            func._value = ir.Function (module, func.type, ''.join ([ funcn ]))
 
   @visitor.when (Param)
   def visit (self, node: Param, module: ir.Module, semantic: Semantic, frame: IRFrame, types: IRTypes, prefix: List[CompositeType] = []): # type: ignore
@@ -171,4 +186,4 @@ class CollectVisitor:
 
         assert (isinstance (refty := types [type_.name], IRType))
 
-        refty.complete (module)
+        refty.complete (module, CollectVisitor.implementations (frame))
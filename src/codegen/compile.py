@@ -14,8 +14,14 @@
 # You should have received a copy of the GNU General Public License
 # along with HULK.  If not, see <http://www.gnu.org/licenses/>.
 #
+from codegen.escape import operands
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Generator, List, Set
+from utils.report import count, phase
 import llvmlite.binding as llvm
 import llvmlite.ir as ir
+import os
+import re
 
 llvm.initialize ()
 llvm.initialize_native_target ()
@@ -23,38 +29,244 @@ llvm.initialize_native_asmprinter ()
 
 default_triple = llvm.get_default_triple ()
 
-def compile (module: ir.Module, level: int = 0) -> llvm.ModuleRef:
+INLINE_THRESHOLD = 225
+PARTITION_SIZE = 64
+REFERENCE = re.compile (r'@(?:"[^"]*"|[-a-zA-Z$._][-a-zA-Z$._0-9]*)')
+
+def declare (value: ir.GlobalValue) -> str:
+
+  if isinstance (value, ir.Function):
+
+    if not value.blocks:
+
+      return str (value)
+    else:
+
+      args = ', '.join ([ str (arg) for arg in value.ftype.args ])
+      return f'declare {value.ftype.return_type} {value.get_reference ()}({args})\n'
+
+  else:
+
+    assert (isinstance (value, ir.GlobalVariable))
+
+    kind = 'constant' if value.global_constant else 'global'
+    return f'{value.get_reference ()} = external {kind} {value.value_type}\n'
+
+def metadata (module: ir.Module) -> None | List[str]:
+
+  named = getattr (module, 'namedmetadata', None)
+  unnamed = getattr (module, 'metadata', None)
+
+  if named == None or unnamed == None:
+
+    return None
+
+  lines = [ f'!{name} = !{{ {", ".join ([ operand.get_reference () for operand in node.operands ])} }}' for name, node in named.items () ]
+
+  return [ *lines, *map (str, unnamed) ]
+
+def partitionable (module: ir.Module, size: int = PARTITION_SIZE) -> bool:
+
+  defined = len ([ function for function in module.functions if function.blocks ])
+
+  return size > 0 and defined > size and metadata (module) != None
+
+def references (value: ir.Value, named: Dict[str, ir.GlobalValue]) -> Generator[ir.GlobalValue, None, None]:
+
+  if isinstance (value, ir.GlobalValue):
+
+    yield value
+
+  elif isinstance (value, ir.FormattedConstant):
+
+    # llvmlite keeps constant expressions (bitcasts, GEPs) as text only,
+    # so that text is the one place left to look for names in
+    #
+    for reference in REFERENCE.findall (value.constant):
+
+      if (found := named.get (reference, None)) != None:
+
+        yield found
+
+  elif isinstance (value, ir.Constant) and isinstance (value.constant, (list, tuple)):
+
+    for element in value.constant:
+
+      yield from references (element, named)
+
+def uses (value: ir.GlobalValue) -> Generator[ir.Value, None, None]:
+
+  if isinstance (value, ir.Function):
+
+    for block in value.blocks:
+
+      for instr in block.instructions:
+
+        yield from operands (instr)
+
+  elif isinstance (value, ir.GlobalVariable) and value.initializer != None:
+
+    yield value.initializer
+
+def partitions (module: ir.Module, size: int = PARTITION_SIZE) -> Generator[str, None, None]:
+
+  header = [ f'target triple = "{module.triple}"', f'target datalayout = "{module.data_layout}"' ]
+  header = '\n'.join ([ *header, *[ it.get_declaration () for it in module.get_identified_types ().values () ], '' ])
+
+  functions: List[ir.Function] = [ ]
+  named: Dict[str, ir.GlobalValue] = { }
+  variables: List[ir.GlobalVariable] = [ ]
+
+  for value in module.globals.values ():
+
+    named [value.get_reference ()] = value
+
+    if not isinstance (value, ir.Function):
+
+      variables.append (value)
+
+    elif value.blocks:
+
+      functions.append (value)
+
+  def needed (values: List[ir.GlobalValue], owned: Set[ir.GlobalValue]) -> List[ir.GlobalValue]:
+
+    found: Dict[int, ir.GlobalValue] = { }
+
+    for value in values:
+
+      for used in uses (value):
+
+        for reference in references (used, named):
+
+          if reference not in owned:
+
+            found.setdefault (id (reference), reference)
+
+    return [ *found.values () ]
+
+  yield ''.join ([ header, *map (declare, needed (variables, set (variables))), *map (str, variables), '\n'.join (metadata (module) or [ ]) ])
+
+  for i in range (0, len (functions), size):
+
+    chunk = functions [i : i + size]
+
+    yield ''.join ([ header, *map (declare, needed (chunk, set (chunk))), *map (str, chunk) ])
+
+def optimizer (level: int, local: bool = True, interprocedural: bool = True) -> llvm.ModulePassManager:
+
+  passes = llvm.create_module_pass_manager ()
+
+  # Inlining small methods (a for loop's next and current, say) and
+  # splitting the objects they worked on back into registers goes first
+  # so the passes below see the resulting plain loops
+  #
+  if level > 1 and interprocedural:
+
+    passes.add_function_inlining_pass (INLINE_THRESHOLD)
+
+  if level > 1 and local:
+
+    passes.add_sroa_pass ()
+
+  if level > 0 and local:
+
+    passes.add_instruction_combining_pass ()
+    passes.add_reassociate_expressions_pass ()
+    passes.add_cfg_simplification_pass ()
+    passes.add_gvn_pass ()
+
+  if level > 1 and interprocedural:
+
+    passes.add_arg_promotion_pass ()
+    passes.add_dead_arg_elimination_pass ()
+
+  if level > 1 and local:
+
+    passes.add_break_critical_edges_pass ()
+
+  if level > 1 and level < 3 and local:
+
+    passes.add_dead_code_elimination_pass ()
+
+  if level > 2 and local:
+
+    passes.add_aggressive_instruction_combining_pass ()
+    passes.add_aggressive_dead_code_elimination_pass ()
+
+  return passes
+
+def optimize (chunk: str, level: int, verify: bool = False) -> bytes:
+
+  mod = llvm.parse_assembly (chunk)
+
+  if verify:
+
+    mod.verify ()
+
+  optimizer (level, interprocedural = False).run (mod)
+
+  return mod.as_bitcode ()
+
+def compile (module: ir.Module, level: int = 0, verify: bool = False, partition: int = PARTITION_SIZE, jobs: int = 1) -> llvm.ModuleRef:
 
   module.triple = default_triple
 
-  (mod := llvm.parse_assembly (str (module))).verify ()
+  # Only modules with more than one function partition go through the
+  # pool, anything smaller takes the sequential path below. On a single
+  # CPU the workers would just take turns, which was measured slower
+  #
+  if jobs > 1 and level > 0 and (os.cpu_count () or 1) > 1 and partitionable (module, partition):
 
-  if level > 0:
+    with phase ('assemble'):
+
+      chunks = [ *partitions (module, size = partition) ]
+
+    with phase ('optimize'):
 
-    passes = llvm.create_module_pass_manager ()
+      with ProcessPoolExecutor (max_workers = min (jobs, len (chunks))) as pool:
 
-    if level > 0:
+        parts = [ *pool.map (optimize, chunks, [ level ] * len (chunks), [ verify ] * len (chunks)) ]
 
-      passes.add_instruction_combining_pass ()
-      passes.add_reassociate_expressions_pass ()
-      passes.add_cfg_simplification_pass ()
-      passes.add_gvn_pass ()
+    with phase ('link'):
 
+      mod = llvm.parse_bitcode (parts [0])
+
+      for part in parts [1:]:
+
+        count ('partitions')
+        mod.link_in (llvm.parse_bitcode (part))
+
+    mod.name = module.name
+
+    # Inlining runs only now that every body is in one module, and the
+    # local passes go again after it so inlined bodies get cleaned up as
+    # they do on the sequential path
+    #
     if level > 1:
 
-      passes.add_arg_promotion_pass ()
-      passes.add_break_critical_edges_pass ()
+      with phase ('optimize module'):
+
+        optimizer (level).run (mod)
+
+    return mod
 
-    if level > 1 and level < 2:
+  with phase ('assemble'):
 
-      passes.add_dead_code_elimination_pass ()
+    mod = llvm.parse_assembly (str (module))
 
-    if level > 2:
+  mod.name = module.name
+
+  if verify:
+
+    with phase ('verify'):
+
+      mod.verify ()
+
+  if level > 0:
 
-      passes.add_aggressive_instruction_combining_pass ()
-      passes.add_aggressive_dead_code_elimination_pass ()
-      passes.add_dead_arg_elimination_pass ()
+    with phase ('optimize'):
 
-    passes.run (mod)
+      optimizer (level).run (mod)
 
   return mod
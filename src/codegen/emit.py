@@ -0,0 +1,81 @@
+# Copyright 2021-2025
+# This file is part of HULK.
+#
+# HULK is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HULK is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HULK.  If not, see <http://www.gnu.org/licenses/>.
+#
+from codegen.compile import default_triple
+from typing import List
+import llvmlite.binding as llvm
+import os
+import subprocess
+import tempfile
+
+LINKER = os.environ.get ('CC', 'cc')
+OBJCOPY = os.environ.get ('OBJCOPY', 'objcopy')
+ENTRY = 'main'
+LIBRARIES = [ '-lm', '-lpthread' ]
+
+class LinkException (Exception):
+
+  def __init__ (self, output: str, message: str, *args: object) -> None:
+
+    super ().__init__ (*args)
+
+    self.message = message
+    self.output = output
+
+  def __str__ (self) -> str:
+
+    return f'{self.output}: {self.message}'
+
+def emit (module: llvm.ModuleRef, level: int = 0) -> bytes:
+
+  for value in [ *module.functions, *module.global_variables ]:
+
+    if not value.is_declaration and value.name != ENTRY:
+
+      value.linkage = llvm.Linkage.internal
+
+  target = llvm.Target.from_triple (default_triple)
+  machine = target.create_target_machine (opt = min (level, 3), reloc = 'pic')
+
+  return machine.emit_object (module)
+
+def invoke (output: str, command: List[str]) -> None:
+
+  result = subprocess.run (command, capture_output = True, text = True)
+
+  if result.returncode != 0:
+
+    raise LinkException (output, result.stderr.strip ())
+
+def link (module: llvm.ModuleRef, output: str, stdlib: List[str], level: int = 0, shared: bool = False) -> None:
+
+  with tempfile.TemporaryDirectory () as directory:
+
+    with open (objfile := os.path.join (directory, 'program.o'), 'wb') as stream:
+
+      stream.write (emit (module, level = level))
+
+    if not shared:
+
+      invoke (output, [ LINKER, '-o', output, objfile, *stdlib, *LIBRARIES ])
+    else:
+
+      # '@' in mangled names reads as a symbol version to the dynamic linker
+      combined = os.path.join (directory, 'combined.o')
+
+      invoke (output, [ LINKER, '-r', '-o', combined, objfile, *stdlib ])
+      invoke (output, [ OBJCOPY, f'--keep-global-symbol={ENTRY}', combined ])
+      invoke (output, [ LINKER, '-shared', '-o', output, combined, *LIBRARIES ])
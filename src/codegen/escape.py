@@ -0,0 +1,267 @@
+# Copyright 2021-2025
+# This file is part of HULK.
+#
+# HULK is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HULK is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HULK.  If not, see <http://www.gnu.org/licenses/>.
+#
+from codegen.type import ALLOCATOR, IRType
+from enum import Flag
+from typing import Dict, List, Set
+from utils.report import count
+import llvmlite.ir as ir
+
+class Flow (Flag):
+
+  NONE = 0
+  RETURNED = 1
+  ESCAPES = 2
+
+Summaries = Dict[str, List[Flow]]
+Users = Dict[int, List[ir.Instruction]]
+
+def operands (instr: ir.Instruction) -> List[ir.Value]:
+
+  if isinstance (instr, ir.PhiInstr):
+
+    return [ value for value, _ in instr.incomings ]
+
+  return [ *instr.operands ]
+
+def users (function: ir.Function) -> Users:
+
+  found: Users = { }
+
+  for block in function.blocks:
+
+    for instr in block.instructions:
+
+      for operand in operands (instr):
+
+        found.setdefault (id (operand), [ ]).append (instr)
+
+  return found
+
+class EscapeAnalysis:
+
+  def __init__ (self, module: ir.Module, known: Summaries = { }) -> None:
+
+    self.defined: List[ir.Function] = [ ]
+    self.module = module
+    self.summaries: Summaries = { }
+    self.users: Dict[str, Users] = { }
+
+    for function in module.functions:
+
+      if function.blocks:
+
+        self.defined.append (function)
+        self.summaries [function.name] = [ Flow.NONE for _ in function.args ]
+        self.users [function.name] = users (function)
+
+      elif (summary := known.get (function.name, None)) != None:
+
+        self.summaries [function.name] = summary
+      else:
+
+        self.summaries [function.name] = [ Flow.ESCAPES for _ in function.args ]
+
+  def callees (self, call: ir.CallInstr) -> List[ir.Function]:
+
+    if isinstance (callee := call.callee, ir.Function):
+
+      return [ callee ]
+
+    elif isinstance (calleety := callee.type, ir.PointerType) and isinstance (fnty := calleety.pointee, ir.FunctionType):
+
+      # Indirect (virtual) calls may land on any implementation whose
+      # signature matches the slot once the receiver is ignored
+      #
+      return [ function for function in self.defined if len (function.args) == len (fnty.args) and IRType.check_signature (function.ftype, fnty) ]
+
+    return [ ]
+
+  def flow (self, function: ir.Function, roots: List[ir.Value]) -> Flow:
+
+    aliases: Set[int] = set ()
+    result = Flow.NONE
+    slots: List[ir.AllocaInstr] = [ ]
+    uses = self.users [function.name]
+    work = [ *roots ]
+
+    while len (work) > 0 and Flow.ESCAPES not in result:
+
+      if id (value := work.pop ()) in aliases:
+
+        continue
+
+      aliases.add (id (value))
+
+      for user in uses.get (id (value), [ ]):
+
+        match user:
+
+          case ir.CastInstr (opname = 'bitcast') | ir.GEPInstr ():
+
+            work.append (user)
+
+          case ir.LoadInstr () | ir.ICMPInstr ():
+
+            pass
+
+          case ir.StoreInstr ():
+
+            stored, address = user.operands
+
+            if stored is not value:
+
+              continue
+
+            elif not isinstance (address, ir.AllocaInstr):
+
+              result = result | Flow.ESCAPES
+            else:
+
+              # Local slots (let variables and the like) are followed
+              # through their loads, as long as nothing else uses them
+              #
+              slots.append (address)
+
+              for other in uses.get (id (address), [ ]):
+
+                if isinstance (other, ir.LoadInstr):
+
+                  work.append (other)
+
+                elif not isinstance (other, ir.StoreInstr) or other.operands [1] is not address:
+
+                  result = result | Flow.ESCAPES
+
+          case ir.CallInstr ():
+
+            callees = self.callees (user)
+
+            if user.callee is value or len (callees) == 0:
+
+              result = result | Flow.ESCAPES
+
+            for i, argument in enumerate (user.args):
+
+              if argument is value:
+
+                for callee in callees:
+
+                  result = result | (Flow.ESCAPES & self.summaries [callee.name] [i])
+
+                  if Flow.RETURNED in self.summaries [callee.name] [i]:
+
+                    work.append (user)
+
+          case ir.Ret ():
+
+            result = result | Flow.RETURNED
+
+          case _:
+
+            result = result | Flow.ESCAPES
+
+    # A slot shared with other values could hand out this object's
+    # storage after it was reused, so those are escapes as well
+    #
+    for slot in slots:
+
+      for other in uses.get (id (slot), [ ]):
+
+        if isinstance (other, ir.StoreInstr) and id (other.operands [0]) not in aliases:
+
+          result = result | Flow.ESCAPES
+
+    return result
+
+  def summarize (self) -> None:
+
+    changed = True
+
+    while changed:
+
+      changed = False
+
+      for function in self.defined:
+
+        summary = [ self.flow (function, [ arg ]) if isinstance (arg.type, ir.PointerType) else Flow.NONE for arg in function.args ]
+
+        if summary != self.summaries [function.name]:
+
+          changed = True
+          self.summaries [function.name] = summary
+
+  def eliminate (self) -> int:
+
+    allocator = self.module.get_global (ALLOCATOR)
+    sites: List[ir.CallInstr] = [ ]
+
+    self.summarize ()
+
+    for function in self.defined:
+
+      for block in function.blocks:
+
+        for instr in block.instructions:
+
+          if isinstance (instr, ir.CallInstr) and instr.callee is allocator:
+
+            count ('allocations')
+
+            if self.flow (function, [ instr ]) == Flow.NONE:
+
+              sites.append (instr)
+
+    for site in sites:
+
+      self.lower (site)
+
+    count ('eliminated', len (sites))
+
+    return len (sites)
+
+  def lower (self, site: ir.CallInstr) -> None:
+
+    block: ir.Block = site.parent
+    uses = self.users [block.function.name].get (id (site), [ ])
+
+    for type_ in [ user.type for user in uses if isinstance (user, ir.CastInstr) and isinstance (user.type, IRType) ] [:1]:
+
+      builder = ir.IRBuilder (block)
+
+      builder.position_before (site)
+
+      stack = type_.create (builder, stack = True).address (builder)
+
+      builder.store (ir.Constant (stack.type.pointee, None), stack)
+      value = builder.bitcast (stack, site.type)
+
+      block.instructions.remove (site)
+
+      for user in uses:
+
+        user.replace_usage (site, value)
+
+      # Tail calls may not touch the caller's stack, which the object
+      # now lives in
+      #
+      for other in block.function.blocks:
+
+        for instr in other.instructions:
+
+          if isinstance (instr, ir.CallInstr):
+
+            instr.tail = ''
@@ -14,7 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with HULK.  If not, see <http://www.gnu.org/licenses/>.
 #
-from typing import List
+from typing import Callable, List
 from codegen.value import IRValueBase
 import llvmlite.ir as ir
 
@@ -44,6 +44,8 @@ class IRFunction (IRValueBase):
 
     super ().__init__ (type_, value)
 
+    self._declare: None | Callable[[IRFunction], ir.Value] = None
+    self._implement: None | Callable[[IRFunction], None] = None
     self._next: IRFunction | None = None
 
   def add_sibling (self, type_: ir.FunctionType, value: ir.Value) -> None:
@@ -73,6 +75,28 @@ class IRFunction (IRValueBase):
 
     return None
 
+  def defer (self, declare: Callable[['IRFunction'], ir.Value]) -> None:
+
+    self._declare = declare
+    self._value = None # type: ignore
+
+  def implement (self, implement: Callable[['IRFunction'], None]) -> None:
+
+    self._implement = implement
+
+  def value (self, builder: ir.IRBuilder):
+
+    if self._value == None:
+
+      assert (self._declare)
+      self._value = self._declare (self)
+
+      if self._implement != None:
+
+        self._implement (self)
+
+    return self._value
+
 class IRMethod (IRFunction):
 
   def __init__ (self, base: ir.Value, type_: ir.FunctionType, value: ir.Value) -> None:
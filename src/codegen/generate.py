@@ -16,10 +16,11 @@
 #
 from codegen.exception import CodegenException
 from codegen.function import IRFunction, IRMethod
+from codegen.integer import IntegerVisitor
 from codegen.irframe import IRFrame
 from codegen.irtypes import IRTypes
 from codegen.type import IRType
-from codegen.value import IRReference, IRValue, IRValueBase, IRVariable
+from codegen.value import alloca, IRInstance, IRInteger, IRIntegerValue, IRReference, IRValue, IRValueBase, IRVariable
 from parser.ast.assignment import DestructiveAssignment
 from parser.ast.base import AstNode
 from parser.ast.block import Block
@@ -32,42 +33,268 @@ from parser.ast.let import Let
 from parser.ast.loops import While
 from parser.ast.operator import BinaryOperator, UnaryOperator
 from parser.ast.value import NewValue, VariableValue
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Tuple
 from utils.builtin import BASE_NAME, SELF_NAME
 from utils.builtin import BASE_VARIABLE, SELF_VARIABLE
 from utils.builtin import BOOLEAN_TYPE, NUMBER_TYPE, STRING_TYPE
 from utils.builtin import CTOR_NAME
+from utils.builtin import STDLIB_CONCAT, STDLIB_SITOS
+from utils.report import count
+from utils.walk import nodes
 import llvmlite.ir as ir
 import utils.visitor as visitor
 
+STRING_BUILDER = 'string_build'
+
+Loop = Tuple[ir.Function, ir.Block, List[IRVariable | ir.PhiInstr]]
+
 class GenerateVisitor:
 
+  def __init__ (self, integers: None | IntegerVisitor = None) -> None:
+
+    self.hierarchy: Dict[Tuple[str, str], List[IRType]] = { }
+    self.integers = integers or IntegerVisitor ()
+    self.loop: None | Loop = None
+    self.tail: Set[int] = set ()
+
+  def implement (self, node: FunctionDecl, candidate: IRFunction, frame: IRFrame, types: IRTypes, prefix: List[IRType]) -> None:
+
+    func: ir.Function = candidate.function # type: ignore
+
+    count ('.'.join ([ *map (lambda a: a.name, prefix), node.name ]))
+
+    descent = IRFrame (frame)
+    implementor = ir.IRBuilder (funcbb := func.append_basic_block ())
+    reassigned = GenerateVisitor.assigned (node.body)
+
+    for name, value in zip ([ p.name for p in node.params ], func.args [1 if len (prefix) > 0 else 0:]):
+      descent [name] = GenerateVisitor.bind (implementor, name, value, reassigned)
+
+    if len (prefix) > 0:
+
+      ir_self = func.args [0]
+      name = SELF_NAME if node.name == CTOR_NAME else SELF_VARIABLE
+
+      descent [name] = GenerateVisitor.bind (implementor, name, ir_self, reassigned)
+
+      if (parent := prefix [-1].parent) != None:
+
+        ir_base: ir.Value = implementor.bitcast (ir_self, parent) # type: ignore
+        name = BASE_NAME if node.name == CTOR_NAME else BASE_VARIABLE
+
+        descent [name] = GenerateVisitor.bind (implementor, name, ir_base, reassigned)
+
+    # Implementing a function may start from inside another one (for
+    # functions specialized on demand), so the tail state is per body
+    #
+    saved = (self.loop, self.tail)
+    tails = GenerateVisitor.tails (node.body)
+
+    self.loop = None
+    self.tail = { id (invoke) for invoke in tails }
+
+    if len (prefix) == 0 and any ([ isinstance (invoke.target, VariableValue) and invoke.target.name == node.name for invoke in tails ]):
+
+      binders: List[IRVariable | ir.PhiInstr] = [ ]
+      entrybb: ir.Block = implementor.block # type: ignore
+
+      implementor.branch (loopbb := func.append_basic_block ('loop'))
+      implementor.position_at_end (loopbb)
+
+      # Parameters the body never assigns become phis merging the
+      # incoming arguments with the ones each self call passes
+      #
+      for param, value in zip (node.params, func.args):
+
+        if isinstance (ref := descent [param.name], IRVariable):
+
+          binders.append (ref)
+        else:
+
+          (phi := implementor.phi (value.type)).add_incoming (value, entrybb)
+
+          binders.append (phi)
+          descent [param.name] = IRValue (phi)
+
+      self.loop = (func, loopbb, binders)
+
+    implementor.ret (self.visit (node.body, implementor, descent, types, prefix = prefix).value (implementor)) # type: ignore
+
+    self.loop, self.tail = saved
+
+    # A tail call returned right away to a function with the very same
+    # signature can be made a guaranteed one
+    #
+    for block in func.blocks:
+
+      match block.instructions [-2:]:
+
+        case [ ir.CallInstr (tail = 'tail', callee = ir.Function (ftype = ftype)) as call, ir.Ret (return_value = value) ] if value is call and ftype == func.ftype:
+
+          count ('guaranteed tail calls')
+          call.tail = 'musttail'
+
   @staticmethod
-  def fillctor (builder: ir.IRBuilder, self_: ir.Value, frame: IRFrame, prefix: List[IRType]):
+  def tails (node: AstNode) -> List[Invoke]:
+
+    match node:
 
-    type_: IRType = prefix [-1]
+      case Block (stmts = [ *_, last ]): return GenerateVisitor.tails (last)
+      case While (): return [ ]
+      case Conditional (): return [ *GenerateVisitor.tails (node.direct), *GenerateVisitor.tails (node.reverse) ]
+      case Let (): return GenerateVisitor.tails (node.body)
+      case Invoke (): return [ node ]
 
-    base: str = '.'.join ([ *map (lambda a: a.name, prefix), '' ])
-    fields: Dict[str, Dict[ir.Type, IRFunction]] = {}
+    return [ ]
+
+  def integer (self, node: AstNode, builder: ir.IRBuilder, frame: IRFrame, types: IRTypes, prefix: List[IRType]) -> ir.Value:
+
+    i64 = ir.IntType (64)
+
+    match node:
+
+      case Constant (value = float ()):
+
+        return ir.Constant (i64, int (node.value))
+
+      case VariableValue () if isinstance (ref := frame [node.name], (IRInteger, IRIntegerValue)):
+
+        return ref.integer (builder)
+
+      case BinaryOperator (operator = '+' | '-' | '*' | '%') if self.integers.integral (node):
+
+        lhs = self.integer (node.argument, builder, frame, types, prefix)
+        rhs = self.integer (node.argument2, builder, frame, types, prefix)
+
+        match node.operator:
+
+          case '+': return builder.add (lhs, rhs)
+          case '-': return builder.sub (lhs, rhs)
+          case '*': return builder.mul (lhs, rhs)
+          case '%': return builder.srem (lhs, rhs)
+
+      case UnaryOperator (operator = '-') if self.integers.integral (node):
+
+        return builder.neg (self.integer (node.argument, builder, frame, types, prefix))
+
+    return builder.fptosi (self.visit (node, builder, frame, types, prefix = prefix).value (builder), i64) # type: ignore
+
+  @staticmethod
+  def assigned (node: AstNode) -> Set[str]:
+
+    return { child.over.name for child in nodes (node) if isinstance (child, DestructiveAssignment) and isinstance (child.over, VariableValue) }
+
+  @staticmethod
+  def bind (builder: ir.IRBuilder, name: str, value: ir.Value, reassigned: Set[str]) -> IRValueBase:
+
+    # Only variables some assignment targets need a stack slot, the rest
+    # are used as the SSA value they were bound to
+    #
+    return IRVariable.create (builder, value) if name in reassigned else IRValue (value)
+
+  def implementors (self, type_: IRType, name: str, types: IRTypes) -> List[IRType]:
+
+    # The whole program is a single module, so the types in it are every
+    # type a receiver statically typed as type_ could ever have
+    #
+    if (found := self.hierarchy.get (key := (type_.name, name), None)) == None:
+
+      owners = { id (owner): owner for _, owner in types.items () if isinstance (owner, IRType) }
+      implementors = [ type_.implementor (owner, name) for owner in owners.values () ]
+
+      found = self.hierarchy [key] = [ *{ id (implementor): implementor for implementor in implementors if implementor != None }.values () ]
+
+    return found
+
+  def devirtualize (self, base: IRValueBase, type_: IRType, name: str, builder: ir.IRBuilder, frame: IRFrame, types: IRTypes) -> None | IRMethod:
+
+    if not isinstance (type_, IRType):
+
+      return None
+
+    elif isinstance (base, IRInstance):
+
+      implementors = [ implementor ] if (implementor := type_.implementor (base.exact, name)) != None else [ ]
+    else:
 
-    for name, value in frame.items ():
+      implementors = self.implementors (type_, name, types)
 
-      if name.startswith (base):
+    if len (implementors) != 1:
 
-        field: str = name [len (base):]
-        head: IRFunction = value # type: ignore
+      return None
 
-        fields [field] = (candidates := {})
+    head: None | IRMethod = None
+    implementor = implementors [0]
+    value = base.value (builder)
 
-        for func in head.candidates:
+    for candidate in frame ['.'.join ([ implementor.name, name ])].candidates: # type: ignore
 
-          candidates [func.type] = func
+      if not head:
 
-    for method_name in type_.methods.keys ():
+        this = value if value.type == candidate.type.args [0] else builder.bitcast (value, candidate.type.args [0])
+        head = IRMethod (this, candidate.type, candidate.value (builder))
+      else:
 
-      for store, functy in type_.index_bare (builder, self_, method_name):
+        head.add_sibling (candidate.type, candidate.value (builder))
 
-        builder.store (fields [method_name] [functy].function, store)
+    return head
+
+  @staticmethod
+  def builtin (node: AstNode, name: str) -> bool:
+
+    return isinstance (node, Invoke) and isinstance (node.target, VariableValue) and node.target.name == name
+
+  @staticmethod
+  def pieces (node: AstNode) -> List[AstNode]:
+
+    if GenerateVisitor.builtin (node, STDLIB_CONCAT.name):
+
+      return [ piece for argument in node.arguments for piece in GenerateVisitor.pieces (argument) ] # type: ignore
+
+    elif GenerateVisitor.builtin (node, STDLIB_SITOS.name):
+
+      if GenerateVisitor.builtin (argument := node.arguments [0], STDLIB_CONCAT.name) or (isinstance (argument, Constant) and isinstance (argument.value, str)): # type: ignore
+
+        return GenerateVisitor.pieces (argument)
+
+    return [ node ]
+
+  def concatenate (self, node: Invoke, builder: ir.IRBuilder, frame: IRFrame, types: IRTypes, prefix: List[IRType]) -> IRValue:
+
+    strty: ir.PointerType = types [STRING_TYPE.name] # type: ignore
+    values: List[ir.Value] = [ ]
+
+    for piece in GenerateVisitor.pieces (node):
+
+      if isinstance (piece, Constant) and piece.value == '':
+
+        continue
+
+      elif not GenerateVisitor.builtin (piece, STDLIB_SITOS.name):
+
+        values.append (self.visit (piece, builder, frame, types, prefix = prefix).value (builder)) # type: ignore
+
+      # strings are immutable, so they are not copied before joining
+      elif (value := self.visit (piece.arguments [0], builder, frame, types, prefix = prefix).value (builder)).type == strty: # type: ignore
+
+        values.append (value)
+      else:
+
+        target: IRFunction = self.visit (piece.target, builder, frame, types, prefix = prefix) # type: ignore
+        values.append (target.call (builder, [ value ]))
+
+    parts = alloca (builder, ir.ArrayType (strty, len (values)))
+
+    for i, value in enumerate (values):
+
+      builder.store (value, builder.gep (parts, [ ir.Constant (ir.IntType (32), 0), ir.Constant (ir.IntType (32), i) ]))
+
+    count ('string parts', len (values))
+
+    function = builder.module.get_global (STRING_BUILDER)
+    arguments = [ ir.Constant (ir.IntType (64), len (values)), builder.bitcast (parts, strty.as_pointer ()) ]
+
+    return IRValue (builder.call (function, arguments))
 
   @visitor.on ('node')
   def visit (self, node: AstNode, builder: ir.IRBuilder, frame: IRFrame, types: IRType, prefix: List[IRType] = []) -> IRValueBase: # type: ignore
@@ -83,6 +310,19 @@ class GenerateVisitor:
 
         raise Exception ('unimplemented')
 
+      case '+' | '-' | '*' | '%' if self.integers.integral (node):
+
+        count ('integer operations')
+        result = IRValue (builder.sitofp (self.integer (node, builder, frame, types, prefix), types [NUMBER_TYPE.name]))
+
+      case '==' | '!=' | '<=' | '>=' | '<' | '>' if self.integers.integral (node.argument) and self.integers.integral (node.argument2):
+
+        lhs = self.integer (node.argument, builder, frame, types, prefix)
+        rhs = self.integer (node.argument2, builder, frame, types, prefix)
+
+        count ('integer operations')
+        result = IRValue (builder.icmp_signed (node.operator, lhs, rhs))
+
       case _:
 
         lhs = self.visit (node.argument, builder, frame, types, prefix = prefix) # type: ignore
@@ -133,20 +373,22 @@ class GenerateVisitor:
     builder.cbranch (cond.value (builder), directbb, reversebb)
 
     builder.position_at_end (directbb)
-    direct = self.visit (node.direct, builder, frame, types, prefix = prefix) # type: ignore
+    direct = self.visit (node.direct, builder, frame, types, prefix = prefix).value (builder) # type: ignore
+    directbb = builder.block
 
     builder.branch (joinbb)
 
     builder.position_at_end (reversebb)
-    reverse = self.visit (node.reverse, builder, frame, types, prefix = prefix) # type: ignore
+    reverse = self.visit (node.reverse, builder, frame, types, prefix = prefix).value (builder) # type: ignore
+    reversebb = builder.block
 
     builder.branch (joinbb)
 
     builder.position_at_end (joinbb)
     phi = builder.phi (direct.type)
 
-    phi.add_incoming (direct.value (builder), directbb)
-    phi.add_incoming (reverse.value (builder), reversebb)
+    phi.add_incoming (direct, directbb)
+    phi.add_incoming (reverse, reversebb)
     return IRValue (phi)
 
   @visitor.when (ClassAccess)
@@ -155,7 +397,12 @@ class GenerateVisitor:
     base: IRValue = self.visit (node.base, builder, frame, types, prefix = prefix) # type: ignore
     type: IRType = types [node.type_.name] # type: ignore
 
-    if node.field != CTOR_NAME:
+    if node.field != CTOR_NAME and (method := self.devirtualize (base, type, node.field, builder, frame, types)) != None:
+
+      count ('devirtualized calls')
+      return method
+
+    elif node.field != CTOR_NAME:
 
       return type.index (builder, base.value (builder), node.field)
     else:
@@ -198,6 +445,12 @@ class GenerateVisitor:
   def visit (self, node: DestructiveAssignment, builder: ir.IRBuilder, frame: IRFrame, types: IRTypes, prefix: List[IRType] = []) -> IRValueBase: # type: ignore
 
     over = self.visit (node.over, builder, frame, types, prefix = prefix) # type: ignore
+
+    if isinstance (over, IRInteger) and self.integers.integral (node.value):
+
+      over.store (builder, self.integer (node.value, builder, frame, types, prefix))
+      return IRValue (over.value (builder))
+
     value = self.visit (node.value, builder, frame, types, prefix = prefix) # type: ignore
 
     assert (isinstance (over, IRReference))
@@ -214,54 +467,91 @@ class GenerateVisitor:
 
     for candidate in first.candidates:
 
-      func: ir.Function = candidate.function # type: ignore
+      if candidate.function != None:
+
+        self.implement (node, candidate, frame, types, prefix)
+      else:
 
-      descent = IRFrame ()
-      implementor = ir.IRBuilder (funcbb := func.append_basic_block ())
+        candidate.implement (lambda candidate: self.implement (node, candidate, frame, types, prefix))
 
-      for name, value in frame.items ():
-        descent [name] = value
+  @visitor.when (Invoke)
+  def visit (self, node: Invoke, builder: ir.IRBuilder, frame: IRFrame, types: IRTypes, prefix: List[IRType] = []) -> IRValueBase: # type: ignore
 
-      for name, value in zip ([ p.name for p in node.params ], func.args [1 if len (prefix) > 0 else 0:]): 
-        descent [name] = IRVariable.create (implementor, value)
+    if GenerateVisitor.builtin (node, STDLIB_CONCAT.name):
 
-      if len (prefix) > 0:
+      return self.concatenate (node, builder, frame, types, prefix)
 
-        ir_self = func.args [0]
+    arguments = map (lambda a: self.visit (a, builder, frame, types, prefix = prefix), node.arguments) # type: ignore
+    target = self.visit (node.target, builder, frame, types, prefix = prefix) # type: ignore
 
-        descent [SELF_NAME if node.name == CTOR_NAME else SELF_VARIABLE] = IRVariable.create (implementor, ir_self)
+    assert (isinstance (target, IRFunction))
 
-        if (parent := prefix [-1].parent) != None:
+    values = [ *map (lambda a: a.value (builder), arguments) ]
 
-          ir_base: ir.Value = implementor.bitcast (ir_self, parent) # type: ignore
+    if id (node) not in self.tail:
 
-          descent [BASE_NAME if node.name == CTOR_NAME else BASE_VARIABLE] = IRVariable.create (implementor, ir_base)
+      return IRValue (target.call (builder, values))
 
-        if node.name == CTOR_NAME:
+    elif self.loop != None and isinstance (node.target, VariableValue) and (func := target.candidate ([ value.type for value in values ])) != None and func.value (builder) is self.loop [0]:
 
-          GenerateVisitor.fillctor (implementor, ir_self, frame, prefix)
+      # Self recursion in tail position rebinds the parameters and jumps
+      # back to the top of the body; code after it is never reached
+      #
+      count ('loopified calls')
 
-      implementor.ret (self.visit (node.body, implementor, descent, types, prefix = prefix).value (implementor)) # type: ignore
+      for binder, value in zip (self.loop [2], values):
 
-  @visitor.when (Invoke)
-  def visit (self, node: Invoke, builder: ir.IRBuilder, frame: IRFrame, types: IRTypes, prefix: List[IRType] = []) -> IRValueBase: # type: ignore
+        if isinstance (binder, ir.PhiInstr):
 
-    arguments = map (lambda a: self.visit (a, builder, frame, types, prefix = prefix), node.arguments) # type: ignore
-    target = self.visit (node.target, builder, frame, types, prefix = prefix) # type: ignore
+          binder.add_incoming (value, builder.block)
+        else:
 
-    assert (isinstance (target, IRFunction))
-    return IRValue (target.call (builder, [ *map (lambda a: a.value (builder), arguments) ]))
+          binder.store (builder, value)
+
+      builder.branch (self.loop [1])
+      builder.position_at_end (builder.function.append_basic_block ('unreachable')) # type: ignore
+
+      return IRValue (ir.Constant (func.type.return_type, ir.Undefined))
+    else:
+
+      count ('tail calls')
+
+      (call := target.call (builder, values)).tail = 'tail'
+      return IRValue (call)
 
   @visitor.when (Let)
   def visit (self, node: Let, builder: ir.IRBuilder, frame: IRFrame, types: IRTypes, prefix: List[IRType] = []) -> IRValueBase: # type: ignore
 
-    descent = IRFrame ()
+    descent = IRFrame (frame)
+    reassigned = GenerateVisitor.assigned (node.body)
+
+    for param in node.params:
+
+      mutable = param.name in reassigned
+
+      if self.integers.lowered (param):
 
-    for name, value in frame.items ():
-      descent [name] = value
+        count ('integer variables')
 
-    for name, value in [ (p.name, self.visit (p.value, builder, frame, types, prefix = prefix)) for p in node.params ]: # type: ignore
-      descent [name] = IRVariable.create (builder, value.value (builder))
+        value = self.integer (param.value, builder, frame, types, prefix)
+        descent [param.name] = IRInteger.create (builder, value, types [NUMBER_TYPE.name]) if mutable else IRIntegerValue (value, types [NUMBER_TYPE.name])
+      else:
+
+        value = self.visit (param.value, builder, frame, types, prefix = prefix).value (builder) # type: ignore
+
+        if mutable:
+
+          descent [param.name] = IRVariable.create (builder, value)
+
+        elif isinstance (param.value, NewValue):
+
+          # The loop iterator of a for is always bound like this, which
+          # lets its next and current calls skip the table
+          #
+          descent [param.name] = IRInstance (value, types [param.value.type_.name]) # type: ignore
+        else:
+
+          descent [param.name] = IRValue (value)
 
     return self.visit (node.body, builder, descent, types, prefix = prefix) # type: ignore
 
@@ -275,6 +565,8 @@ class GenerateVisitor:
 
     self_: IRReference = type_.create (builder)
 
+    type_.install (builder, self_.address (builder))
+
     arguments = map (lambda a: self.visit (a, builder, frame, types, prefix = prefix), node.arguments) # type: ignore
     constructor = frame ['.'.join ([ *map (lambda a: a.name, [ *prefix, type_ ]), CTOR_NAME ])] # type: ignore
 
@@ -310,13 +602,14 @@ class GenerateVisitor:
     builder.position_at_end (directbb := nowfn.append_basic_block ('direct'))
 
     value = self.visit (node.direct, builder, frame, types, prefix = prefix) # type: ignore
+    endbb: ir.Block = builder.block # type: ignore
 
     builder.position_at_end (nowbb)
 
     store = IRVariable (builder, value.type)
 
     builder.branch (backbb := nowfn.append_basic_block ('back'))
-    builder.position_at_end (directbb)
+    builder.position_at_end (endbb)
 
     store.store (builder, value.value (builder))
 
@@ -0,0 +1,466 @@
+# Copyright 2021-2025
+# This file is part of HULK.
+#
+# HULK is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HULK is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HULK.  If not, see <http://www.gnu.org/licenses/>.
+#
+from parser.ast.assignment import DestructiveAssignment
+from parser.ast.base import AstNode
+from parser.ast.block import Block
+from parser.ast.conditional import Conditional
+from parser.ast.constant import Constant
+from parser.ast.decl import FunctionDecl, ProtocolDecl, TypeDecl
+from parser.ast.indirection import Indirection
+from parser.ast.invoke import Invoke
+from parser.ast.let import Let
+from parser.ast.loops import While
+from parser.ast.operator import BinaryOperator, UnaryOperator
+from parser.ast.param import Param, VarParam
+from parser.ast.value import NewValue, VariableValue
+from typing import Dict, List, Tuple
+from utils.builtin import NUMBER_TYPE
+import math
+import utils.visitor as visitor
+
+# Every integer in this range is exactly representable as a double, so
+# doing the arithmetic on i64 yields bit-identical results
+#
+LIMIT = 2 ** 53
+NARROWING = 2
+WIDENING = 8
+
+Interval = None | Tuple[float, float]
+Env = Dict[int, Interval]
+Scope = List[Dict[str, VarParam]]
+
+COMPARISONS = { '<': '>=', '<=': '>', '>': '<=', '>=': '<', '==': '!=', '!=': '==' }
+MIRRORED = { '<': '>', '<=': '>=', '>': '<', '>=': '<=', '==': '==', '!=': '!=' }
+
+def bounded (interval: Interval) -> bool:
+
+  return interval != None and interval [0] <= interval [1] and -LIMIT <= interval [0] and interval [1] <= LIMIT
+
+def empty (interval: Interval) -> bool:
+
+  return interval != None and interval [0] > interval [1]
+
+def join (a: Interval, b: Interval) -> Interval:
+
+  if a == None or b == None:
+
+    return None
+
+  elif empty (a) or empty (b):
+
+    return b if empty (a) else a
+
+  return (min (a [0], b [0]), max (a [1], b [1]))
+
+def widen (old: Interval, new: Interval, thresholds: List[float] = [ ]) -> Interval:
+
+  if old == None or new == None or empty (old) or empty (new):
+
+    return join (old, new)
+
+  lo = old [0] if new [0] >= old [0] else max ([ -math.inf, *[ t for t in thresholds if t <= new [0] ] ])
+  hi = old [1] if new [1] <= old [1] else min ([ math.inf, *[ t for t in thresholds if t >= new [1] ] ])
+
+  return (lo, hi)
+
+def contains (interval: Tuple[float, float], value: float) -> bool:
+
+  return interval [0] <= value <= interval [1]
+
+def constants (node: object) -> List[float]:
+
+  if isinstance (node, list):
+
+    return [ value for item in node for value in constants (item) ]
+
+  elif isinstance (node, Constant) and isinstance (node.value, float) and node.value.is_integer ():
+
+    return [ node.value - 1, node.value, node.value + 1 ]
+
+  elif isinstance (node, AstNode):
+
+    return [ value for child in vars (node).values () for value in constants (child) ]
+
+  return [ ]
+
+def assigns (node: object) -> bool:
+
+  if isinstance (node, list):
+
+    return any ([ assigns (item) for item in node ])
+
+  elif isinstance (node, AstNode):
+
+    return isinstance (node, DestructiveAssignment) or any ([ assigns (value) for value in vars (node).values () ])
+
+  return False
+
+class IntegerVisitor:
+
+  def __init__ (self) -> None:
+
+    self.bindings: Dict[int, Interval] = { }
+    self.recording = True
+    self.values: Dict[int, Interval] = { }
+
+  def integral (self, node: AstNode) -> bool:
+
+    return bounded (self.values.get (id (node), None))
+
+  def lowered (self, param: VarParam) -> bool:
+
+    return bounded (self.bindings.get (id (param), None))
+
+  def record (self, node: AstNode, interval: Interval) -> Interval:
+
+    if self.recording:
+
+      self.values [id (node)] = interval if id (node) not in self.values else join (self.values [id (node)], interval)
+
+    return interval
+
+  def assign (self, param: VarParam, interval: Interval, env: Env) -> None:
+
+    env [id (param)] = interval
+
+    if self.recording:
+
+      self.bindings [id (param)] = interval if id (param) not in self.bindings else join (self.bindings [id (param)], interval)
+
+  @staticmethod
+  def lookup (name: str, scope: Scope) -> None | VarParam:
+
+    for names in reversed (scope):
+
+      if name in names:
+
+        return names [name]
+
+    return None
+
+  @staticmethod
+  def merge (a: Env, b: Env) -> Env:
+
+    return { key: join (a.get (key, None), b.get (key, None)) for key in a.keys () | b.keys () }
+
+  def walk (self, node: AstNode, env: Env, scope: Scope) -> Interval:
+
+    # Nodes yielding no integer still get their children visited so
+    # nested numbers are recorded
+    #
+    for value in vars (node).values ():
+
+      for child in (value if isinstance (value, list) else [ value ]):
+
+        if isinstance (child, AstNode):
+
+          self.visit (child, env, scope) # type: ignore
+
+    return self.record (node, None)
+
+  def refine (self, node: AstNode, truth: bool, env: Env, scope: Scope) -> Env:
+
+    refined = dict (env)
+
+    if not isinstance (node, BinaryOperator) or assigns (node):
+
+      return refined
+
+    elif node.operator == '&' and truth:
+
+      return self.refine (node.argument2, truth, self.refine (node.argument, truth, env, scope), scope)
+
+    elif node.operator not in COMPARISONS:
+
+      return refined
+
+    operator = node.operator if truth else COMPARISONS [node.operator]
+
+    for this, other, op in [ (node.argument, node.argument2, operator), (node.argument2, node.argument, MIRRORED [operator]) ]:
+
+      if not isinstance (this, VariableValue) or (param := IntegerVisitor.lookup (this.name, scope)) == None:
+
+        continue
+
+      recording, self.recording = self.recording, False
+      bound = self.visit (other, dict (env), scope) # type: ignore
+      self.recording = recording
+
+      if (current := refined.get (id (param), None)) == None or bound == None or empty (current):
+
+        continue
+
+      lo, hi = current
+
+      match op:
+
+        case '<': hi = min (hi, bound [1] - 1)
+        case '<=': hi = min (hi, bound [1])
+        case '>': lo = max (lo, bound [0] + 1)
+        case '>=': lo = max (lo, bound [0])
+        case '==': lo, hi = max (lo, bound [0]), min (hi, bound [1])
+
+      refined [id (param)] = (lo, hi)
+
+    return refined
+
+  @visitor.on ('node')
+  def visit (self, node: AstNode, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    pass
+
+  @visitor.when (BinaryOperator)
+  def visit (self, node: BinaryOperator, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    a = self.visit (node.argument, env, scope) # type: ignore
+    b = self.visit (node.argument2, env, scope) # type: ignore
+
+    if a == None or b == None or empty (a) or empty (b):
+
+      return self.record (node, None if a == None or b == None else (1, 0))
+
+    match node.operator:
+
+      case '+': result = (a [0] + b [0], a [1] + b [1])
+      case '-': result = (a [0] - b [1], a [1] - b [0])
+
+      case '*':
+
+        # a zero times a negative value is a negative zero, which
+        # prints differently from the integer zero
+        #
+        if (contains (a, 0) and b [0] < 0) or (contains (b, 0) and a [0] < 0):
+
+          return self.record (node, None)
+
+        products = [ x * y for x in a for y in b if not (math.isinf (x) or math.isinf (y)) or (x != 0 and y != 0) ]
+        result = (min (products), max (products))
+
+      case '%':
+
+        if contains (b, 0) or a [0] < 0:
+
+          return self.record (node, None)
+
+        result = (0, min (a [1], max (abs (b [0]), abs (b [1])) - 1))
+
+      case _: return self.record (node, None)
+
+    return self.record (node, result)
+
+  @visitor.when (Block)
+  def visit (self, node: Block, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    last: Interval = None
+
+    for stmt in node.stmts:
+
+      last = self.visit (stmt, env, scope) # type: ignore
+
+    return self.record (node, last)
+
+  @visitor.when (Conditional)
+  def visit (self, node: Conditional, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    self.visit (node.condition, env, scope) # type: ignore
+
+    direct = self.refine (node.condition, True, env, scope)
+    reverse = self.refine (node.condition, False, env, scope)
+
+    a = self.visit (node.direct, direct, scope) # type: ignore
+    b = self.visit (node.reverse, reverse, scope) # type: ignore
+
+    env.clear ()
+    env.update (IntegerVisitor.merge (direct, reverse))
+
+    return self.record (node, join (a, b))
+
+  @visitor.when (Constant)
+  def visit (self, node: Constant, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    if isinstance (node.value, float) and node.value.is_integer () and abs (node.value) <= LIMIT:
+
+      return self.record (node, (node.value, node.value))
+
+    return self.record (node, None)
+
+  @visitor.when (DestructiveAssignment)
+  def visit (self, node: DestructiveAssignment, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    value = self.visit (node.value, env, scope) # type: ignore
+
+    if isinstance (node.over, VariableValue) and (param := IntegerVisitor.lookup (node.over.name, scope)) != None:
+
+      self.assign (param, value, env)
+    else:
+
+      self.visit (node.over, env, scope) # type: ignore
+
+    return self.record (node, value)
+
+  @visitor.when (FunctionDecl)
+  def visit (self, node: FunctionDecl, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    self.visit (node.body, { }, [ ]) # type: ignore
+
+    return None
+
+  @visitor.when (Indirection)
+  def visit (self, node: Indirection, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    return self.walk (node, env, scope)
+
+  @visitor.when (Invoke)
+  def visit (self, node: Invoke, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    for argument in node.arguments:
+
+      self.visit (argument, env, scope) # type: ignore
+
+    self.visit (node.target, env, scope) # type: ignore
+
+    return self.record (node, None)
+
+  @visitor.when (Let)
+  def visit (self, node: Let, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    names: Dict[str, VarParam] = { }
+
+    for param in node.params:
+
+      value = self.visit (param.value, env, scope) # type: ignore
+
+      if param.type_ is NUMBER_TYPE:
+
+        self.assign (param, value, env)
+        names [param.name] = param
+
+      else:
+
+        names [param.name] = None # type: ignore
+
+    result = self.visit (node.body, env, [ *scope, names ]) # type: ignore
+
+    for param in node.params:
+
+      env.pop (id (param), None)
+
+    return self.record (node, result)
+
+  @visitor.when (NewValue)
+  def visit (self, node: NewValue, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    for argument in node.arguments:
+
+      self.visit (argument, env, scope) # type: ignore
+
+    return self.record (node, None)
+
+  @visitor.when (Param)
+  def visit (self, node: Param, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    return self.walk (node, env, scope)
+
+  @visitor.when (ProtocolDecl)
+  def visit (self, node: ProtocolDecl, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    return None
+
+  @visitor.when (TypeDecl)
+  def visit (self, node: TypeDecl, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    for stmt in node.body.stmts:
+
+      self.visit (stmt.value if isinstance (stmt, VarParam) else stmt, { }, [ ]) # type: ignore
+
+    return None
+
+  @visitor.when (UnaryOperator)
+  def visit (self, node: UnaryOperator, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    value = self.visit (node.argument, env, scope) # type: ignore
+
+    if node.operator == '-' and value != None and not empty (value) and not contains (value, 0):
+
+      return self.record (node, (-value [1], -value [0]))
+
+    return self.record (node, None)
+
+  @visitor.when (VariableValue)
+  def visit (self, node: VariableValue, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    if (param := IntegerVisitor.lookup (node.name, scope)) != None:
+
+      return self.record (node, env.get (id (param), None))
+
+    return self.record (node, None)
+
+  @visitor.when (While)
+  def visit (self, node: While, env: Env, scope: Scope) -> Interval: # type: ignore
+
+    recording, self.recording = self.recording, False
+
+    entry = dict (env)
+    head = dict (env)
+
+    # Widen the loop head state until it is stable, then narrow it with
+    # a few plain iterations to recover the bounds the condition gives.
+    # Bounds first jump to constants found in the loop itself, and only
+    # after a few rounds straight to infinity
+    #
+    thresholds = sorted (set (constants ([ node.condition, node.direct ])))
+
+    for i in range (WIDENING + 2 * len (head) + 1):
+
+      steps = thresholds if i < WIDENING else [ ]
+      after = { key: widen (head.get (key, None), value, steps) for key, value in self.iterate (node, entry, head, scope).items () }
+
+      if after == head:
+
+        break
+
+      head = after
+
+    else:
+
+      head = { key: None for key in head }
+
+    for i in range (NARROWING):
+
+      head = self.iterate (node, entry, head, scope)
+
+    self.recording = recording
+
+    self.iterate (node, entry, head, scope)
+    self.visit (node.condition, head, scope) # type: ignore
+
+    env.clear ()
+    env.update (self.refine (node.condition, False, head, scope))
+
+    return self.record (node, None)
+
+  def iterate (self, node: While, entry: Env, head: Env, scope: Scope) -> Env:
+
+    state = dict (head)
+
+    self.visit (node.condition, state, scope) # type: ignore
+
+    body = self.refine (node.condition, True, state, scope)
+
+    self.visit (node.direct, body, scope) # type: ignore
+
+    return IntegerVisitor.merge (entry, body)
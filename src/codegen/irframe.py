@@ -15,7 +15,7 @@
 # along with HULK.  If not, see <http://www.gnu.org/licenses/>.
 #
 from codegen.value import IRValueBase
-from typing import Any, Dict, Iterator
+from typing import Any, Dict, Iterator, Set, Tuple
 
 ValueDict = Dict[str, IRValueBase]
 
@@ -23,15 +23,26 @@ class IRFrame:
 
   def __getitem__ (self, key: str) -> IRValueBase:
 
-    return self._store [key]
+    frame: None | IRFrame = self
 
-  def __init__ (self) -> None:
+    while frame != None:
+
+      if key in frame._store:
+
+        return frame._store [key]
+
+      frame = frame.parent
+
+    raise KeyError (key)
+
+  def __init__ (self, parent: 'None | IRFrame' = None) -> None:
 
     self._store: ValueDict = { }
+    self.parent = parent
 
   def __iter__ (self) -> Iterator[str]:
 
-    return self._store.__iter__ ()
+    return (name for name, _ in self.items ())
 
   def __setitem__ (self, key: str, value: IRValueBase) -> None:
 
@@ -39,8 +50,26 @@ class IRFrame:
 
   def get (self, key: str, default: Any) -> None | IRValueBase:
 
-    return self._store.get (key, default)
+    try:
+
+      return self [key]
+
+    except KeyError:
+
+      return default
+
+  def items (self) -> Iterator[Tuple[str, IRValueBase]]:
+
+    frame: None | IRFrame = self
+    seen: Set[str] = set ()
+
+    while frame != None:
+
+      for name, value in frame._store.items ():
+
+        if name not in seen:
 
-  def items (self):
+          seen.add (name)
+          yield (name, value)
 
-    return self._store.items ()
+      frame = frame.parent
@@ -15,24 +15,132 @@
 # along with HULK.  If not, see <http://www.gnu.org/licenses/>.
 #
 from codegen.compile import default_triple
-from ctypes import CFUNCTYPE
-from typing import List
+from ctypes import byref, c_int, c_size_t, c_uint64, CFUNCTYPE, POINTER, Structure
+from typing import Dict, List, Tuple
+from utils.report import count
 import llvmlite.binding as llvm
+import time
 
-def run (module: llvm.ModuleRef, stdlib: List[str]):
+class GCStats (Structure):
 
-  target = llvm.Target.from_triple (default_triple)
-  machine = target.create_target_machine ()
+  _fields_ = [ (name, c_uint64) for name in [ 'collections', 'pause_total', 'pause_max', 'heap_size', 'heap_used', 'heap_limit', 'allocated', 'freed' ] ]
 
-  with llvm.create_mcjit_compiler (module, machine) as jit:
+Collector = Tuple[List[llvm.ResourceTracker], object, object]
+
+class Session:
+
+  _default: 'None | Session' = None
+
+  def __init__ (self) -> None:
+
+    target = llvm.Target.from_triple (default_triple)
+
+    self.machine = target.create_target_machine ()
+    self.jit = llvm.create_lljit_compiler (self.machine)
+
+    self._collectors: Dict[str, Collector] = { }
+    self._count = 0
+    self._libraries: Dict[str, str] = { }
+    self._trackers: List[llvm.ResourceTracker] = [ ]
+
+  @staticmethod
+  def default () -> 'Session':
+
+    if Session._default == None:
+
+      Session._default = Session ()
+
+    return Session._default
+
+  def library (self, file: str) -> str:
+
+    if (name := self._libraries.get (file, None)) == None:
+
+      builder = llvm.JITLibraryBuilder ()
+
+      builder.add_object_file (file)
+      builder.add_current_process ()
+
+      self._trackers.append (builder.link (self.jit, name := f'stdlib{len (self._libraries)}'))
+      self._libraries [file] = name
+
+    return name
+
+  def collector (self, file: str) -> Collector:
+
+    if (collector := self._collectors.get (file, None)) == None:
+
+      trackers = [ self.jit.lookup (self.library (file), name) for name in [ 'gc_set_limit', 'gc_stats' ] ]
+
+      limit = CFUNCTYPE (None, c_size_t) (trackers [0] ['gc_set_limit'])
+      stats = CFUNCTYPE (None, POINTER (GCStats)) (trackers [1] ['gc_stats'])
+
+      self._collectors [file] = (collector := (trackers, limit, stats))
+
+    return collector
+
+  def load (self, module: llvm.ModuleRef, stdlib: List[str]) -> llvm.ResourceTracker:
+
+    builder = llvm.JITLibraryBuilder ()
+
+    builder.add_ir (module)
 
     for file in stdlib:
 
-      jit.add_object_file (file)
+      builder.add_jit_library (self.library (file))
+
+    builder.export_symbol ('main')
+
+    self._count = self._count + 1
+
+    return builder.link (self.jit, f'program{self._count}')
+
+  def run (self, module: llvm.ModuleRef, stdlib: List[str], limit: int = 0) -> float:
+
+    start = time.perf_counter ()
+
+    tracker = self.load (module, stdlib)
+
+    # Collector wiring needs a stdlib to look its entry points up in,
+    # programs linked against nothing just run
+    #
+    collector = None if len (stdlib) == 0 else self.collector (stdlib [0])
+    before, after = GCStats (), GCStats ()
+
+    try:
+
+      cfunc = CFUNCTYPE (c_int) (tracker ['main'])
+
+      if collector != None:
+
+        _, setlimit, getstats = collector
+
+        setlimit (limit) # type: ignore
+        getstats (byref (before)) # type: ignore
+
+      startup = time.perf_counter () - start
+
+      cfunc ()
+
+    finally:
+
+      # Unloads the program's code, the stdlib stays linked for later runs
+      #
+      tracker.close ()
+
+    if collector != None:
+
+      _, _, getstats = collector
+
+      getstats (byref (after)) # type: ignore
+
+      count ('gc collections', after.collections - before.collections)
+      count ('gc pause (ms)', (after.pause_total - before.pause_total) / 1000000)
+      count ('gc max pause (ms)', after.pause_max / 1000000)
+      count ('gc heap (bytes)', after.heap_size)
 
-    jit.finalize_object ()
+    return startup
 
-    cfunc = jit.get_function_address ('main')
-    cfunc = CFUNCTYPE (None) (cfunc)
+def run (module: llvm.ModuleRef, stdlib: List[str], session: None | Session = None, limit: int = 0) -> float:
 
-    cfunc ()
+  return (session or Session.default ()).run (module, stdlib, limit = limit)
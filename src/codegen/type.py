@@ -15,17 +15,20 @@
 # along with HULK.  If not, see <http://www.gnu.org/licenses/>.
 #
 from codegen.function import IRMethod
-from codegen.value import IRReference, IRValueBase
+from codegen.value import alloca, IRReference, IRValueBase
 from collections import namedtuple
 from enum import Enum
-from typing import Dict, List, Self
+from typing import Callable, Dict, List, Self
 import llvmlite.ir as ir
 
+ALLOCATOR = 'object_alloc'
 PARENT_FIELD = '@parent'
+VTABLE_FIELD = '@vtable'
 
 Index = namedtuple ('Index', [ 'depth', 'order', 'type' ])
 IndexDict = Dict[str, Index]
 
+Implementations = Callable[['IRType', str], List[ir.Function]]
 MethodDict = Dict[str, List[ir.FunctionType]]
 TypeDict = Dict[str, ir.Type]
 
@@ -55,7 +58,9 @@ class IRType (ir.PointerType):
   def __init__ (self, context: ir.Context, name: str):
 
     self._name = name
+    self._table: None | ir.GlobalVariable = None
     self._type = context.get_identified_type (name)
+    self._vtable = context.get_identified_type (f'{name}.vtable')
 
     self._attributes: TypeDict = { }
     self._index: IndexDict = {}
@@ -74,20 +79,25 @@ class IRType (ir.PointerType):
 
     return len (types) == len (against) and not any ([ not IRType.check_signature (a, b) for a, b in zip (against, types) ])
 
-  def complete (self, module: ir.Module):
+  def complete (self, module: ir.Module, implementations: Implementations):
 
     if self._type.is_opaque:
 
       index = 0
       fields = [ ]
+      slot = 0
+      slots = [ ]
 
       if self.parent:
 
-        self.parent.complete (module)
+        self.parent.complete (module, implementations)
 
         fields.append (self.parent._type)
         index = index + 1
 
+        slots.append (self.parent._vtable)
+        slot = slot + 1
+
       for name, type_ in self.attributes.items ():
 
         if self._index.get (name) != None:
@@ -116,27 +126,81 @@ class IRType (ir.PointerType):
 
         if for_ != None:
 
-          self._index [name] = Index (depth, for_.order, FieldType.METHOD)
+          self._index [name] = Index (depth + for_.depth, for_.order, FieldType.METHOD)
         else:
 
           self._index [name] = Index (0, indeces := [], FieldType.METHOD)
 
           for i, type_ in enumerate (types):
 
-            indeces.append (i + index)
-            fields.append (type_.as_pointer ())
+            indeces.append (i + slot)
+            slots.append (type_.as_pointer ())
 
-          index = index + len (types)
+          slot = slot + len (types)
 
       self._type.set_body (*fields)
+      self._vtable.set_body (*slots)
       self._size = index
 
-  def create (self, builder: ir.IRBuilder):
+      self._table = ir.GlobalVariable (module, self._vtable, f'{self.name}.vtable')
+      self._table.global_constant = True
+      self._table.initializer = self.table (self, implementations) # type: ignore
+
+  def create (self, builder: ir.IRBuilder, stack: bool = False):
+
+    if stack:
+
+      return IRReference (alloca (builder, self._type))
+    else:
+
+      allocator = builder.module.get_global (ALLOCATOR)
+      size = ir.Constant (self, None).gep ([ ir.Constant (ir.IntType (32), 1) ]).ptrtoint (ir.IntType (64)) # type: ignore
+
+      return IRReference (builder.bitcast (builder.call (allocator, [ size ]), self))
+
+  def install (self, builder: ir.IRBuilder, value: ir.Value) -> None:
+
+    assert (self._table)
+
+    builder.store (builder.bitcast (self._table, ir.IntType (8).as_pointer ()), self.root (builder, value)) # type: ignore
+
+  def implementor (self, owner: 'IRType', name: str) -> 'None | IRType':
+
+    first: None | IRType = self
 
-    return IRReference (builder.alloca (self._type, 1))
+    while first != None and name not in first.methods:
+
+      first = first.parent
+
+    if first == None:
+
+      return None
+
+    types = first.methods [name]
+    first = owner
+
+    while first != None and not (name in first.methods and IRType.check_signatures (first.methods [name], types)):
+
+      first = first.parent
+
+    # An owner outside this type's hierarchy tells nothing about which
+    # implementation fills the slot
+    #
+    last: None | IRType = owner
+
+    while last != None and last is not self:
+
+      last = last.parent
+
+    return None if last == None else first
 
   def index (self, builder: ir.IRBuilder, value: ir.Value, name: str) -> IRValueBase:
 
+    if name not in self._index and self.parent != None:
+
+      field_offset = ir.Constant (ir.IntType (32), 0)
+      return self.parent.index (builder, builder.gep (value, [ field_offset, field_offset ]), name)
+
     _, _, field_type = self._index [name]
 
     match field_type:
@@ -154,7 +218,8 @@ class IRType (ir.PointerType):
 
           if not head:
 
-            head = IRMethod (value, type_, builder.load (func)) # type: ignore
+            base = value if value.type == type_.args [0] else builder.bitcast (value, type_.args [0]) # type: ignore
+            head = IRMethod (base, type_, builder.load (func)) # type: ignore
           else:
 
             head.add_sibling (type_, builder.load (func)) # type: ignore
@@ -171,27 +236,25 @@ class IRType (ir.PointerType):
     assert (value.type.pointee == self._type) # type: ignore
 
     depth, at, field_type = self._index [name]
-    first = (last := self)
+    field_offset = ir.Constant (ir.IntType (32), 0)
+    last = self
 
-    for i in range (depth):
+    if field_type == FieldType.METHOD:
 
-      assert (first)
-      assert (self.parent)
+      value = builder.bitcast (builder.load (self.root (builder, value)), self._vtable.as_pointer ()) # type: ignore
 
-      field_offset = ir.Constant (ir.IntType (32), 0)
-      pointer_offset = ir.Constant (ir.IntType (32), 0)
+    for i in range (depth):
 
-      value = builder.gep (value, [ field_offset, pointer_offset ])
-      value = builder.bitcast (value, self.parent) # type: ignore
+      assert (last.parent)
 
-      first = (last := first).parent # type: ignore
+      value = builder.gep (value, [ field_offset, field_offset ])
+      last = last.parent
 
     match field_type:
 
       case FieldType.ATTRIBUTE:
 
         index: int = at
-        field_offset = ir.Constant (ir.IntType (32), 0)
         pointer_offset = ir.Constant (ir.IntType (32), index)
         type_ = last.attributes [name]
 
@@ -206,9 +269,43 @@ class IRType (ir.PointerType):
 
         for index, type_ in zip (indices, last.methods [name]):
 
-          field_offset = ir.Constant (ir.IntType (32), 0)
           pointer_offset = ir.Constant (ir.IntType (32), index)
 
           yield (builder.gep (value, [ field_offset, pointer_offset ]), type_)
 
       case _: raise Exception (f'unknown field type {field_type}')
+
+  def root (self, builder: ir.IRBuilder, value: ir.Value) -> ir.Value:
+
+    field_offset = ir.Constant (ir.IntType (32), 0)
+    first = self
+
+    while first.parent != None:
+
+      value = builder.gep (value, [ field_offset, field_offset ])
+      first = first.parent
+
+    _, at, _ = first._index [VTABLE_FIELD]
+
+    return builder.gep (value, [ field_offset, ir.Constant (ir.IntType (32), at) ])
+
+  def table (self, owner: 'IRType', implementations: Implementations) -> ir.Constant:
+
+    values: List[ir.Constant] = [ ] if self.parent == None else [ self.parent.table (owner, implementations) ]
+
+    for name, types in self.methods.items ():
+
+      if self._index [name].depth == 0:
+
+        first = owner
+
+        while first is not self and not (name in first.methods and IRType.check_signatures (first.methods [name], types)):
+
+          assert (first.parent)
+          first = first.parent
+
+        for func, type_ in zip (implementations (first, name), types):
+
+          values.append (func if func.type == type_.as_pointer () else func.bitcast (type_.as_pointer ())) # type: ignore
+
+    return ir.Constant (self._vtable, values)
@@ -16,6 +16,16 @@
 #
 import llvmlite.ir as ir
 
+def alloca (builder: ir.IRBuilder, type_: ir.Type) -> ir.Value:
+
+  if (block := builder.function.entry_basic_block) == builder.block: # type: ignore
+
+    return builder.alloca (type_, 1)
+  else:
+
+    (entry := ir.IRBuilder (block)).position_at_start (block)
+    return entry.alloca (type_, 1)
+
 #
 # Abstract type
 #
@@ -62,10 +72,50 @@ class IRVariable (IRReference):
 
   def __init__ (self, builder: ir.IRBuilder, type_: ir.Type, managed: bool = False) -> None:
 
-    super ().__init__ (builder.alloca (type_, 1), managed = managed)
+    super ().__init__ (alloca (builder, type_), managed = managed)
 
   @staticmethod
   def create (builder: ir.IRBuilder, value: ir.Value):
 
     (self := IRVariable (builder, value.type)).store (builder, value) # type: ignore
     return self
+
+class IRInstance (IRValue):
+
+  @property
+  def exact (self): return self._exact
+
+  def __init__ (self, value: ir.Value, exact: ir.Type) -> None:
+
+    super ().__init__ (value)
+
+    self._exact = exact
+
+class IRInteger (IRVariable):
+
+  def __init__ (self, builder: ir.IRBuilder, number: ir.Type, managed: bool = False) -> None:
+
+    super ().__init__ (builder, ir.IntType (64), managed = managed)
+
+    self._type = number
+
+  @staticmethod
+  def create (builder: ir.IRBuilder, value: ir.Value, number: ir.Type = ir.DoubleType ()):
+
+    (self := IRInteger (builder, number)).store (builder, value) # type: ignore
+    return self
+
+  def integer (self, builder: ir.IRBuilder): return builder.load (self.address (builder))
+  def store (self, builder: ir.IRBuilder, value: ir.Value): builder.store (value if value.type == ir.IntType (64) else builder.fptosi (value, ir.IntType (64)), self.address (builder)) # type: ignore
+  def value (self, builder: ir.IRBuilder): return builder.sitofp (self.integer (builder), self._type)
+
+class IRIntegerValue (IRValue):
+
+  def __init__ (self, value: ir.Value, number: ir.Type = ir.DoubleType ()) -> None:
+
+    super ().__init__ (value)
+
+    self._type = number
+
+  def integer (self, builder: ir.IRBuilder): return self._value
+  def value (self, builder: ir.IRBuilder): return builder.sitofp (self._value, self._type)
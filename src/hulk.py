@@ -14,17 +14,29 @@
 # You should have received a copy of the GNU General Public License
 # along with HULK.  If not, see <http://www.gnu.org/licenses/>.
 #
+from codegen.cache import Cache, DEFAULT_LIMIT
 from codegen.codegen import Codegen
+from codegen.collect import DEFAULT_BUDGET
 from codegen.compile import compile
+from codegen.emit import link, LinkException
 from codegen.run import run
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from lexer.lexer import Lexer, Token
 from parser.parser import Parser
 from parser.viewer import PrintVisitor
-from typing import Iterable
+from typing import Iterable, List, Tuple
+from utils.exception import BasedException
+from utils.report import attach, count, phase, Phase, Report
 import argparse
+import llvmlite.binding as llvm
+import sys
 
 from semantic.check import SemanticCheck
 
+EMIT = [ 'ast', 'ir', 'opt-ir', 'none' ]
+STDLIB = [ 'src/stdlib/stdlib.lib' ]
+
 def ignore (source: Iterable[Token]):
 
   lastline = 1
@@ -40,41 +52,189 @@ def ignore (source: Iterable[Token]):
 
   yield Token (lastcolumn + 1, lastline, 'EOF', None) # type: ignore
 
+Result = Tuple[List[str], None | str, None | llvm.ModuleRef]
+
+def process (file: str, args: argparse.Namespace) -> Result:
+
+  cache = None if not args.cache_dir else Cache (args.cache_dir, limit = args.cache_size)
+  emit = args.emit
+  log: List[str] = [ ]
+
+  with open (file, 'r') as stream:
+
+    lines = stream.readlines ()
+
+  if cache != None and not emit:
+
+    key = Cache.fingerprint (''.join (lines), args.O, STDLIB, args.specialize)
+
+    with phase ('cache'):
+
+      module = cache.get (key)
+      count ('hits' if module != None else 'misses')
+
+    if module != None:
+
+      return (log, None, module)
+
+  try:
+
+    with phase ('lex'):
+
+      tokens = list (ignore (Lexer (lines)))
+      count ('tokens', len (tokens))
+
+    with phase ('parse'):
+
+      ast = Parser (iter (tokens))
+
+    if 'ast' in emit:
+
+      log.append ('\n'.join (PrintVisitor ().visit (ast)))
+      log.append ('--*-*-*-*-*--')
+
+    with phase ('semantic'):
+
+      semantic = SemanticCheck ().check (ast)
+
+    if 'ast' in emit:
+
+      log.append ('\n'.join (PrintVisitor ().visit (ast)))
+      log.append ('--*-*-*-*-*--')
+
+    with phase ('codegen'):
+
+      module = Codegen (budget = args.specialize).generate (ast, semantic, name = str (file))
+
+    if 'ir' in emit:
+
+      log.append (str (module))
+      log.append ('--*-*-*-*-*--')
+
+  except BasedException as e:
+
+    return (log, f'{file}: {e}', None)
+
+  with phase ('compile'):
+
+    module = compile (module, level = args.O, verify = args.verify, jobs = args.j)
+
+  if 'opt-ir' in emit:
+
+    log.append (str (module))
+    log.append ('--*-*-*-*-*--')
+
+  if cache != None and not emit:
+
+    cache.put (key, module)
+
+  return (log, None, module)
+
+def worker (file: str, args: argparse.Namespace):
+
+  args = argparse.Namespace (**{ **vars (args), 'j': 1 })
+  report = None if not args.time_report else Report (file, objects = args.time_report_objects)
+
+  with report or nullcontext ():
+
+    log, error, module = process (file, args)
+
+  data = None if report == None else report.root.as_dict ()
+
+  return (log, error, None if module == None else module.as_bitcode (), data)
+
+def execute (args: argparse.Namespace, log: List[str], error: None | str, module: None | llvm.ModuleRef) -> bool:
+
+  for line in log:
+
+    print (line)
+
+  if error != None:
+
+    print (error, file = sys.stderr)
+    return True
+
+  assert (module)
+
+  if args.o == None:
+
+    with phase ('run'):
+
+      count ('startup (ms)', 1000 * run (module, STDLIB, limit = args.gc_limit))
+  else:
+
+    try:
+
+      with phase ('link'):
+
+        link (module, args.o, STDLIB, level = args.O, shared = args.shared)
+
+    except LinkException as e:
+
+      print (e, file = sys.stderr)
+      return True
+
+  return False
+
 def program ():
 
   parser = argparse.ArgumentParser (description = 'hulk compiler')
 
   parser.add_argument ('input', help = 'input file', nargs = '*')
+  parser.add_argument ('-j', default = 1, help = 'number of parallel compile jobs (files, or partitions of a single file)', metavar = 'N', type = int)
+  parser.add_argument ('-o', default = None, help = 'write a native executable instead of running', metavar = 'OUTPUT')
   parser.add_argument ('-O', default = 0, help = 'optimization level', metavar = 'LEVEL', type = int)
+  parser.add_argument ('--cache-dir', default = None, help = 'compilation cache directory', metavar = 'DIR')
+  parser.add_argument ('--cache-size', default = DEFAULT_LIMIT, help = 'compilation cache size limit', metavar = 'BYTES', type = int)
+  parser.add_argument ('--emit', action = 'append', choices = EMIT, default = None, help = 'print intermediate representation (may be repeated)')
+  parser.add_argument ('--gc-limit', default = 0, help = 'heap size limit for programs run in process, 0 for none (native executables read HULK_GC_LIMIT)', metavar = 'BYTES', type = int)
+  parser.add_argument ('--shared', action = 'store_true', help = 'with -o, write a shared object')
+  parser.add_argument ('--specialize', default = DEFAULT_BUDGET, help = 'specialize functions with more overloads only on demand', metavar = 'N', type = int)
+  parser.add_argument ('--time-report', choices = [ 'json', 'table' ], const = 'table', default = None, help = 'print per phase time and memory usage', nargs = '?')
+  parser.add_argument ('--time-report-objects', action = 'store_true', help = 'with --time-report, also count live objects per phase (walks the heap at every phase boundary)')
+  parser.add_argument ('--verify', action = 'store_true', help = 'verify generated module')
 
   args = parser.parse_args ()
+  args.emit = [ kind for kind in args.emit or [ ] if kind != 'none' ]
 
-  for file in args.input:
+  if args.o != None and len (args.input) > 1:
 
-    with open (file, 'r') as stream:
+    parser.error ('-o can not be used with multiple input files')
 
-      lines = stream.readlines ()
-      tokens = ignore (Lexer (lines)) 
-      ast = Parser (tokens)
+  failed = False
+  report = None if not args.time_report else Report (objects = args.time_report_objects)
 
-      print ('\n'.join (PrintVisitor ().visit (ast)))
-      print ('--*-*-*-*-*--')
+  with report or nullcontext ():
 
-      semantic = SemanticCheck ().check (ast)
+    if args.j > 1 and len (args.input) > 1:
+
+      with ProcessPoolExecutor (max_workers = args.j) as pool:
+
+        futures = [ pool.submit (worker, file, args) for file in args.input ]
+
+        for future in futures:
+
+          log, error, bitcode, data = future.result ()
+          module = None if bitcode == None else llvm.parse_bitcode (bitcode)
+
+          with attach (Phase.from_dict (data)) if data != None else nullcontext ():
+
+            failed = execute (args, log, error, module) or failed
+
+    else:
+
+      for file in args.input:
 
-      print ('\n'.join (PrintVisitor ().visit (ast)))
-      print ('--*-*-*-*-*--')
+        with phase (file):
 
-      module = Codegen ().generate (ast, semantic, name = str (file))
+          failed = execute (args, *process (file, args)) or failed
 
-      print (module)
-      print ('--*-*-*-*-*--')
+  if report != None:
 
-      module = compile (module, level = args.O)
+    print (report.json () if args.time_report == 'json' else report.table (), file = sys.stderr)
 
-      print (module)
-      print ('--*-*-*-*-*--')
+  sys.exit (1 if failed else 0)
 
-      run (module, [ 'src/stdlib/stdlib.lib' ])
+if __name__ == '__main__':
 
-program ()
+  program ()
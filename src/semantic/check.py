@@ -21,11 +21,12 @@ from semantic.complain import ComplainVisitor
 from semantic.scope import Scope
 from semantic.transform import TransformStage, TransformVisitor
 from semantic.types import Types
-from semantic.typing import TypingVisitor
+from semantic.worklist import TypingWorklist
 from typing import List, Tuple
 from utils.builtin import builtin_constants
 from utils.builtin import builtin_functions
 from utils.builtin import builtin_types
+from utils.report import phase
 
 Semantic = namedtuple ('Semantic', [ 'scope', 'types' ])
 Stage = Tuple[TransformStage, TransformStage, bool]
@@ -44,8 +45,11 @@ class SemanticCheck:
     for name, type_ in builtin_functions.items ():
       scope [name] = type_
 
-    CollectVisitor (CollectStage.COLLECT).visit (ast, scope, types) # type: ignore
-    CollectVisitor (CollectStage.LINK).visit (ast, scope, types) # type: ignore
+    for collect_stage in [ CollectStage.COLLECT, CollectStage.LINK ]:
+
+      with phase (str (collect_stage)):
+
+        CollectVisitor (collect_stage).visit (ast, scope, types) # type: ignore
 
     stages: List[Stage] = [
 
@@ -57,14 +61,22 @@ class SemanticCheck:
 
     for collect_stage, transform_stage, check in stages:
 
-      collected = TransformVisitor (collect_stage).visit (ast, scope, types) # type: ignore
-      collected = TransformVisitor (transform_stage).visit (ast, scope, types, collected) # type: ignore
+      with phase (str (transform_stage)):
+
+        with phase (str (collect_stage)):
+
+          collected = TransformVisitor (collect_stage).visit (ast, scope, types) # type: ignore
+
+        with phase ('transform'):
+
+          collected = TransformVisitor (transform_stage).visit (ast, scope, types, collected) # type: ignore
+
+        if check:
 
-      while check:
+          TypingWorklist (ast, scope, types).run ()
 
-        done, _ = TypingVisitor ().visit (ast, scope, types) # type: ignore
-        if done  == 0: break
+    with phase ('ComplainVisitor'):
 
-    ComplainVisitor ().visit (ast, scope, types) # type: ignore
+      ComplainVisitor ().visit (ast, scope, types) # type: ignore
 
     return Semantic (scope = scope, types = types)
@@ -15,21 +15,32 @@
 # along with HULK.  If not, see <http://www.gnu.org/licenses/>.
 #
 from semantic.type import Type
-from typing import Any, Dict, Iterator
+from typing import Any, Dict, Iterator, Set, Tuple
 
 class Scope:
 
   def __getitem__ (self, key: str) -> Type:
 
-    return self._store [key]
+    scope: None | Scope = self
 
-  def __init__ (self) -> None:
+    while scope != None:
+
+      if key in scope._store:
+
+        return scope._store [key]
+
+      scope = scope.parent
+
+    raise KeyError (key)
+
+  def __init__ (self, parent: 'None | Scope' = None) -> None:
 
     self._store: Dict[str, Type] = { }
+    self.parent = parent
 
   def __iter__ (self) -> Iterator[str]:
 
-    return self._store.__iter__ ()
+    return (name for name, _ in self.items ())
 
   def __setitem__ (self, key: str, value: Type) -> None:
 
@@ -37,8 +48,26 @@ class Scope:
 
   def get (self, key: str, default: Any) -> Any | Type:
 
-    return self._store.get (key, default)
+    try:
+
+      return self [key]
+
+    except KeyError:
+
+      return default
+
+  def items (self) -> Iterator[Tuple[str, Type]]:
+
+    scope: None | Scope = self
+    seen: Set[str] = set ()
+
+    while scope != None:
+
+      for name, value in scope._store.items ():
+
+        if name not in seen:
 
-  def items (self):
+          seen.add (name)
+          yield (name, value)
 
-    return self._store.items ()
+      scope = scope.parent
@@ -0,0 +1,121 @@
+# Copyright 2021-2025
+# This file is part of HULK.
+#
+# HULK is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HULK is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HULK.  If not, see <http://www.gnu.org/licenses/>.
+#
+from collections import OrderedDict
+from parser.ast.base import AstNode
+from semantic.type import FunctionType, Type, WildcardType
+from typing import Any, Callable, Dict, List, Set, Tuple
+from utils.report import count
+from utils.walk import nodes
+
+Check = Callable[[List[Type]], bool]
+Domains = List[List[Type]]
+Saved = Tuple[List[Tuple[AstNode, Any]], List[Tuple[FunctionType, OrderedDict, Type]]]
+
+WILDCARD = WildcardType ()
+
+def snapshot (node: AstNode, functions: List[FunctionType] = [ ]) -> Saved:
+
+  annotated = [ (child, child.type_) for child in nodes (node) if hasattr (child, 'type_') ]
+  signatures = [ (functy, OrderedDict (functy.params), functy.type_) for functy in functions ]
+
+  return (annotated, signatures)
+
+def restore (saved: Saved) -> None:
+
+  annotated, signatures = saved
+
+  for child, type_ in annotated:
+
+    child.type_ = type_
+
+  for functy, params, type_ in signatures:
+
+    functy._params = OrderedDict (params)
+    functy._type_ = type_
+
+def solve (domains: Domains, check: Check) -> Domains:
+
+  memo: Dict[Tuple[int, ...], bool] = { }
+
+  def probe (assignment: List[Type]) -> bool:
+
+    if (valid := memo.get (key := tuple (map (id, assignment)), None)) == None:
+
+      count ('probes')
+      valid = memo [key] = check (assignment)
+
+    return valid
+
+  def fixed (domains: Domains) -> List[Type]:
+
+    return [ domain [0] if len (domain) == 1 else WILDCARD for domain in domains ]
+
+  def search (domains: Domains, partial: List[Type]) -> None | List[Type]:
+
+    if len (partial) == len (domains):
+
+      return partial
+
+    for value in domains [len (partial)]:
+
+      assignment = [ *partial, value ]
+
+      if probe ([ *assignment, *fixed (domains [len (assignment):]) ]) and (found := search (domains, assignment)) != None:
+
+        return found
+
+    return None
+
+  changed = True
+
+  while changed:
+
+    changed = False
+
+    for i, domain in enumerate (domains):
+
+      others = fixed (domains)
+      keep = [ value for value in domain if probe ([ *others [:i], value, *others [i + 1:] ]) ]
+
+      if len (keep) < len (domain):
+
+        changed = True
+        domains [i] = keep
+
+      if len (keep) == 0:
+
+        return domains
+
+  # Pruning binds undecided positions to wildcards, so a value may
+  # survive only because no single other choice was made for it. Each
+  # one is kept only if some complete assignment holding it type checks,
+  # as exhaustive enumeration required; every assignment found supports
+  # all of its values at once
+  #
+  supported: List[Set[int]] = [ set () for _ in domains ]
+
+  for i, domain in enumerate (domains):
+
+    for value in domain:
+
+      if id (value) not in supported [i] and (found := search ([ *domains [:i], [ value ], *domains [i + 1:] ], [ ])) != None:
+
+        for support, other in zip (supported, found):
+
+          support.add (id (other))
+
+  return [ [ value for value in domain if id (value) in support ] for domain, support in zip (domains, supported) ]
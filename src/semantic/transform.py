@@ -25,11 +25,12 @@ from parser.ast.param import Param, VarParam
 from parser.ast.value import VariableValue
 from semantic.exception import SemanticException
 from semantic.scope import Scope
-from semantic.type import CompositeType, FunctionType, NamedType, ProtocolType, Type, UnionType
+from semantic.solve import restore, snapshot, solve
+from semantic.type import CompositeType, FunctionType, ProtocolType, Type, UnionType
 from semantic.types import Types
 from semantic.typing import TypingVisitor
-from typing import Dict, Generator, List, Set
-from utils.alternate import alternate
+from typing import Dict, List
+from utils.alternate import alternate, alternatehead
 from utils.builtin import CTOR_NAME, SELF_NAME
 import utils.visitor as visitor
 
@@ -45,25 +46,6 @@ class TransformStage (Enum):
   GUESS_PARAMS = 6
   TRIM_ATTRIBUTES = 7
 
-def alternatelist (list_: List[List[Type]]) -> Generator[List[Type], None, None]:
-
-  if len (list_) == 0:
-
-    pass
-  elif len (list_) == 1:
-
-    for type_ in list_[0]: yield [ type_ ]
-  else:
-
-    head = list_ [0]
-    tail = list_ [1:]
-
-    for ahead in alternatelist ([ head ]):
-
-      for atail in alternatelist (tail):
-
-        yield [ *ahead, *atail ]
-
 class TransformVisitor:
 
   def __init__ (self, stage: TransformStage) -> None:
@@ -143,52 +125,36 @@ class TransformVisitor:
 
       case TransformStage.GUESS_ARGUMENTS:
 
-        descent: Scope = Scope ()
+        descent: Scope = Scope (scope)
         functy: FunctionType = scope [name] # type: ignore
-        valid = [ set () for i in range (1 + len (functy.params)) ]
-
-        for as_, type_ in scope.items ():
-
-          descent [as_] = type_
+        keys = [ *functy.params.keys () ]
+        saved = snapshot (node)
 
-        for alternative_ in alternate (functy):
+        def check (assignment: List[Type]) -> bool:
 
-          alternative: FunctionType = alternative_ # type: ignore
-          descent [name] = alternative_
+          descent [name] = FunctionType (functy.name, OrderedDict (zip (keys, assignment [1:])), assignment [0])
 
           try:
 
             TypingVisitor ().visit (node, descent, types, prefix = prefix) # type: ignore
-          except SemanticException as e:
-
-            continue
-
-          for set_, type_ in zip (valid, [ alternative.type_, *alternative.params.values () ]):
-
-            if not isinstance (type_, UnionType):
+          except SemanticException:
 
-              assert (isinstance (type_, NamedType))
-              set_.add (type_.name)
+            return False
+          finally:
 
-            else:
+            restore (saved)
 
-              for type_ in type_.types:
+          return True
 
-                set_.add (type_)
+        valid = solve ([ [ *alternatehead (type_) ] for type_ in [ functy.type_, *functy.params.values () ] ], check)
 
         if any ([ len (set_) == 0 for set_ in valid ]):
 
           raise SemanticException (node, 'can not guess function signature')
 
-        params = OrderedDict ()
-        valid = [ [ *map (lambda a: types [a], set_) ] for set_ in valid ]
         valid = [ set_[0] if len (set_) == 1 else UnionType (set_) for set_ in valid ]
 
-        for key, set_ in zip (functy.params.keys (), valid [1:]):
-
-          params [key] = set_
-
-        functy._params = params
+        functy._params = OrderedDict (zip (keys, valid [1:]))
         functy._type_ = valid [0]
 
   @visitor.when (Param)
@@ -231,7 +197,7 @@ class TransformVisitor:
 
         if isinstance (type_ := scope [name], ProtocolType): # type: ignore
 
-          implements: List[Type] = collected [type_.name] # type: ignore
+          implements: List[Type] = types.implementors (type_) # type: ignore
 
           scope [name] = (type_ := UnionType (implements))
           node.type_ = type_
@@ -251,7 +217,7 @@ class TransformVisitor:
 
           proto: ProtocolType = proto_ # type: ignore
 
-          if proto.implementedBy (type_):
+          if type_ in types.implementors (proto):
 
             last [proto.name] = last.get (proto.name, [])
             last [proto.name] . append (type_)
@@ -267,29 +233,33 @@ class TransformVisitor:
 
         attributes_: List[str] = [ *type_.attributes.keys () ]
         collected_: Dict[str, List[Type]] = collected # type: ignore
-        valid: List[Set[Type]] = [ set () for i in range (len (attributes_)) ]
+        saved = snapshot (node, [ *type_.methods.values () ])
 
-        for alternative in alternatelist ([ collected_ ['.'.join ([ base, name ])] for name in attributes_ ]):
+        def check (assignment: List[Type]) -> bool:
 
-          for name, attribute in zip (attributes_, alternative):
+          for name, attribute in zip (attributes_, assignment):
 
             type_.attributes [name] = attribute
 
           try:
+
             TypingVisitor ().visit (node, scope, types, prefix = prefix) # type: ignore
           except SemanticException:
 
-            continue
+            return False
+          finally:
+
+            restore (saved)
 
-          for set_, attribute in zip (valid, alternative):
+          return True
 
-            set_.add (attribute)
+        valid = solve ([ [ *collected_ ['.'.join ([ base, name ])] ] for name in attributes_ ], check)
 
         if any ([ len (set_) == 0 for set_ in valid ]):
 
           raise SemanticException (node, 'can not guess type attribute types')
 
-        for name, attribute in zip (attributes_, [ l[0] if len (l) == 1 else UnionType (l) for l in [ [*set_] for set_ in valid ] ]):
+        for name, attribute in zip (attributes_, [ set_[0] if len (set_) == 1 else UnionType (set_) for set_ in valid ]):
 
           type_.attributes [name] = attribute
 
@@ -15,7 +15,8 @@
 # along with HULK.  If not, see <http://www.gnu.org/licenses/>.
 #
 from heapq import merge
-from typing import Any, Dict, List, OrderedDict, Self, Set
+from typing import Any, Callable, Dict, List, OrderedDict, Self, Set, Tuple
+from weakref import ref, WeakKeyDictionary, WeakValueDictionary
 
 #
 # Abstract base classes
@@ -23,6 +24,11 @@ from typing import Any, Dict, List, OrderedDict, Self, Set
 
 class Type (object):
 
+  _generation = 0
+  _memo: 'WeakKeyDictionary[Type, WeakKeyDictionary[Type, Dict[str, bool]]]' = WeakKeyDictionary ()
+  _memoized = 0
+  _shape = 0
+
   def __init__ (self, **kw) -> None:
 
     super ().__init__ ()
@@ -30,7 +36,13 @@ class Type (object):
   @staticmethod
   def compare_types (a, b, strict: bool = False) -> bool:
 
-    if isinstance (a, AnyType): return True if not strict else isinstance (b, AnyType)
+    return Type.memoize ('strict' if strict else 'compare', a, b, lambda: Type._compare_types (a, b, strict))
+
+  @staticmethod
+  def _compare_types (a, b, strict: bool) -> bool:
+
+    if isinstance (a, WildcardType) or isinstance (b, WildcardType): return True
+    elif isinstance (a, AnyType): return True if not strict else isinstance (b, AnyType)
     elif isinstance (a, UnionType): return any ([ Type.compare_types (t, b) for t in a.types ]) and (True if not strict else isinstance (b, UnionType) and len (a.types) == len (b.types))
     elif isinstance (a, ProtocolType) and isinstance (b, ProtocolType): return a.name == b.name if strict else b.castableTo (a)
     elif isinstance (a, ProtocolType) and isinstance (b, CompositeType): return a.name == b.name if strict else a.implementedBy (b)
@@ -40,6 +52,40 @@ class Type (object):
     elif isinstance (b, NamedType) and isinstance (a, NamedType): return a.name == b.name
     else: return a == b
 
+  @staticmethod
+  def memoize (op: str, a, b, compute: Callable[[], bool]) -> bool:
+
+    if Type._memoized != Type._generation:
+
+      Type._memo.clear ()
+      Type._memoized = Type._generation
+
+    # Both operands are weak keys, so a long running session (or a
+    # worker compiling many files) does not keep every type it ever
+    # compared alive
+    #
+    if not isinstance (a, Type) or not isinstance (b, Type):
+
+      return compute ()
+    elif (hit := (results := Type._memo.setdefault (a, WeakKeyDictionary ()).setdefault (b, { })).get (op, None)) != None:
+
+      return hit
+    else:
+
+      results [op] = (result := compute ())
+      return result
+
+  @staticmethod
+  def reshape () -> None:
+
+    Type._shape = Type._shape + 1
+    Type.touch ()
+
+  @staticmethod
+  def touch () -> None:
+
+    Type._generation = Type._generation + 1
+
   @staticmethod
   def merge (a, b):
 
@@ -48,13 +94,23 @@ class Type (object):
       if not isinstance (b, UnionType):
 
         return Type.merge (a, UnionType ([ b ]))
+      elif (hit := (merged := UnionType._merged.setdefault (a, WeakKeyDictionary ())).get (b, None)) != None and (union := hit ()) != None:
+
+        return union
       else:
 
         types: Dict[str, Type] = { }
 
         for type_ in a.types: types [type_.name] = type_ # type: ignore
         for type_ in b.types: types [type_.name] = type_ # type: ignore
-        return UnionType ([ *types.values () ])
+
+        # Operands are weak keys and the result a weak reference (it is
+        # often one of the operands), so merged unions die with their
+        # last user like interned ones do
+        #
+        merged [b] = ref (union := UnionType ([ *types.values () ]))
+
+        return union
 
     elif isinstance (b, UnionType):
 
@@ -65,6 +121,25 @@ class Type (object):
 
 TypeDict = Dict[str, Type]
 
+class Members (Dict[str, Type]):
+
+  def __delitem__ (self, key: str) -> None:
+
+    super ().__delitem__ (key)
+    Type.reshape ()
+
+  def __setitem__ (self, key: str, value: Type) -> None:
+
+    if key not in self:
+
+      super ().__setitem__ (key, value)
+      Type.reshape ()
+
+    elif self [key] is not value:
+
+      super ().__setitem__ (key, value)
+      Type.touch ()
+
 class NamedType (Type):
 
   def __init__ (self, name: str, **kw) -> None:
@@ -104,6 +179,7 @@ class CompositeType (NamedType):
   def parent (self, parent: None | Self = None) -> None:
 
     self._parent = parent
+    Type.reshape ()
 
   def __getitem__ (self, key: str) -> Type:
 
@@ -114,12 +190,17 @@ class CompositeType (NamedType):
 
     super ().__init__ (name)
 
-    self._attributes = attributes
-    self._methods = methods
+    self._attributes = Members (attributes)
+    self._methods = Members (methods)
+    self._names: Tuple[int, Set[str], Set[str]] = (-1, set (), set ())
     self._parent = parent
 
   def castableTo (self, other: Self) -> bool:
 
+    return Type.memoize ('castable', self, other, lambda: self._castableTo (other))
+
+  def _castableTo (self, other: Self) -> bool:
+
     first = self
 
     while (first) != None:
@@ -148,6 +229,15 @@ class CompositeType (NamedType):
 
     return self.member (key, True) or default
 
+  def names (self, attr: bool = True) -> Set[str]:
+
+    if self._names [0] != Type._shape:
+
+      methods = set (self._methods.keys ()) if self._parent == None else self._methods.keys () | self._parent.names (False)
+      self._names = (Type._shape, self._attributes.keys () | methods, methods)
+
+    return self._names [1 if attr else 2]
+
   def member (self, key: str, attr: bool = True) -> None | Type:
 
     if attr and (got := self._attributes.get (key, None)) != None:
@@ -192,8 +282,18 @@ class ProtocolType (CompositeType):
 
     super ().__init__ (name, attributes, methods, parent)
 
+    self._required: Tuple[int, Set[str]] = (-1, set ())
+
   def implementedBy (self, other: CompositeType) -> bool:
 
+    return Type.memoize ('implemented', self, other, lambda: self._implementedBy (other))
+
+  def _implementedBy (self, other: CompositeType) -> bool:
+
+    if not self.required () <= other.names ():
+
+      return False
+
     for name, type_ in ({ **self.attributes, **self.methods }).items ():
 
       if not Type.compare_types (other.get (name, None), type_):
@@ -201,6 +301,15 @@ class ProtocolType (CompositeType):
 
     return True if self.parent == None else self.parent.implementedBy (other)
 
+  def required (self) -> Set[str]:
+
+    if self._required [0] != Type._shape:
+
+      own = { name for name, type_ in ({ **self.attributes, **self.methods }).items () if not isinstance (type_, AnyType | WildcardType) }
+      self._required = (Type._shape, own if self.parent == None else own | self.parent.required ())
+
+    return self._required [1]
+
 class Ref (NamedType):
 
   def __init__(self, name: str) -> None:
@@ -215,17 +324,37 @@ class SimpleType (NamedType):
 
 class UnionType (Type):
 
+  _interned: 'WeakValueDictionary[Tuple[int, ...], UnionType]' = WeakValueDictionary ()
+  _merged: 'WeakKeyDictionary[UnionType, WeakKeyDictionary[UnionType, ref[UnionType]]]' = WeakKeyDictionary ()
+
   @property
   def types (self):
 
     return self._types
 
+  def __new__ (cls, types: List[Type]) -> 'UnionType':
+
+    members: Dict[int, Type] = { }
+
+    for type_ in types:
+
+      for member in (type_.types if isinstance (type_, UnionType) else [ type_ ]):
+
+        members.setdefault (id (member), member)
+
+    if (union := cls._interned.get (key := tuple (members.keys ()), None)) == None:
+
+      union = super ().__new__ (cls)
+      union._types = [ *members.values () ]
+
+      cls._interned [key] = union
+
+    return union
+
   def __init__ (self, types: List[Type]) -> None:
 
     super ().__init__ ()
 
-    self._types = types
-
 class VectorType (Type):
 
   @property
@@ -238,3 +367,17 @@ class VectorType (Type):
     super ().__init__ ()
 
     self._type_ = type_
+
+class WildcardType (CompositeType):
+
+  # Stands for a type signature inference has not settled on yet. It is
+  # compatible with every type (see compare_types), and as an object with
+  # every member any access on it yields another wildcard
+  #
+  def __init__ (self) -> None:
+
+    super ().__init__ ('?', { }, { })
+
+  def member (self, key: str, attr: bool = True) -> None | Type:
+
+    return self
@@ -14,8 +14,9 @@
 # You should have received a copy of the GNU General Public License
 # along with HULK.  If not, see <http://www.gnu.org/licenses/>.
 #
-from semantic.type import Type, TypeDict
-from typing import Any, Dict, Iterator
+from functools import reduce
+from semantic.type import CompositeType, ProtocolType, Type, TypeDict
+from typing import Any, Dict, Iterator, List, Set, Tuple
 
 class Types:
 
@@ -25,6 +26,9 @@ class Types:
 
   def __init__ (self) -> None:
 
+    self._concrete: None | Tuple[List[Type], Type] = None
+    self._implementors: Dict[str, Tuple[int, List[CompositeType]]] = { }
+    self._owners: Tuple[int, Dict[str, Set[str]]] = (-1, { })
     self._store: TypeDict = { }
 
   def __iter__ (self) -> Iterator[str]:
@@ -35,10 +39,61 @@ class Types:
 
     self._store [key] = value
 
+    self._concrete = None
+    self._implementors = { }
+    self._owners = (-1, { })
+
+  def concrete (self) -> List[Type]:
+
+    if self._concrete == None:
+
+      concrete = [ type_ for type_ in self._store.values () if not isinstance (type_, ProtocolType) ]
+      self._concrete = (concrete, reduce (Type.merge, concrete))
+
+    return self._concrete [0]
+
+  def everything (self) -> Type:
+
+    self.concrete ()
+
+    assert (self._concrete)
+    return self._concrete [1]
+
   def get (self, key: str, default: Any) -> None | Type:
 
     return self._store.get (key, default)
 
+  def implementors (self, proto: ProtocolType) -> List[CompositeType]:
+
+    if (last := self._implementors.get (proto.name, None)) == None or last [0] != Type._generation:
+
+      candidates = self.owners (proto.required ())
+      implementors = [ type_ for type_ in self.concrete () if isinstance (type_, CompositeType) and type_.name in candidates and proto.implementedBy (type_) ]
+
+      self._implementors [proto.name] = (last := (Type._generation, implementors))
+
+    return last [1]
+
   def items (self):
 
     return self._store.items ()
+
+  def owners (self, names: Set[str]) -> Set[str]:
+
+    if self._owners [0] != Type._shape:
+
+      self._owners = (Type._shape, owners := { })
+
+      for type_ in self.concrete ():
+
+        if isinstance (type_, CompositeType):
+
+          for name in type_.names ():
+
+            owners.setdefault (name, set ()).add (type_.name)
+
+    if len (names) == 0:
+
+      return { type_.name for type_ in self.concrete () }
+
+    return set.intersection (*[ self._owners [1].get (name, set ()) for name in names ])
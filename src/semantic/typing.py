@@ -29,17 +29,51 @@ from parser.ast.param import Param, VarParam
 from parser.ast.value import Constant, NewValue, VariableValue
 from semantic.exception import SemanticException
 from semantic.scope import Scope
-from semantic.type import AnyType, CompositeType, FunctionType, NamedType, ProtocolType, Type, UnionType, VectorType
+from semantic.type import AnyType, CompositeType, FunctionType, NamedType, ProtocolType, Type, UnionType, VectorType, WildcardType
 from semantic.type import Ref as TypeRef
 from semantic.types import Types
-from typing import List, Sequence, Tuple
+from typing import List, Sequence, Set, Tuple
 from utils.builtin import BASE_NAME, BASE_VARIABLE, BOOLEAN_TYPE, CTOR_NAME, NUMBER_TYPE, PRINTABLE_TYPE, SELF_NAME, SELF_VARIABLE, STRING_TYPE
 import utils.visitor as visitor
 
 TypeReport = Tuple[int, Type]
 
+ALL_TYPES = '*'
+
+def typekey (name: str) -> str:
+
+  return f'type:{name}'
+
 class TypingVisitor:
 
+  def __init__ (self) -> None:
+
+    self.reads: Set[str] = set ()
+    self.writes: Set[str] = set ()
+
+  def compare (self, a: Type, b: Type) -> bool:
+
+    if isinstance (a, CompositeType | UnionType) or isinstance (b, CompositeType | UnionType):
+
+      for type_ in [ *(a.types if isinstance (a, UnionType) else [ a ]), *(b.types if isinstance (b, UnionType) else [ b ]) ]:
+
+        if isinstance (type_, ProtocolType):
+
+          self.reads.add (ALL_TYPES)
+
+        elif isinstance (type_, CompositeType):
+
+          self.depend (type_)
+
+    return Type.compare_types (a, b)
+
+  def depend (self, type_: None | CompositeType) -> None:
+
+    while type_ != None:
+
+      self.reads.add (typekey (type_.name))
+      type_ = type_.parent
+
   @staticmethod
   def derivate (of: Type, types: Types, hints: List[Type] = []) -> TypeReport:
 
@@ -50,7 +84,7 @@ class TypingVisitor:
       return (0 if Type.compare_types (of, actually, True) else 1, reduce (Type.merge, hints))
     elif isinstance (of, AnyType):
 
-      return (1, reduce (Type.merge, filter (lambda t: not isinstance (t, ProtocolType), [ type_ for _, type_ in types.items () ])))
+      return (1, types.everything ())
 
     return (0, of)
 
@@ -138,7 +172,7 @@ class TypingVisitor:
 
             for against in (want := [ NUMBER_TYPE, (type_ := BOOLEAN_TYPE) ]):
 
-              if not (Type.compare_types (arg1, against) or not Type.compare_types (arg2, against)):
+              if not (self.compare (arg1, against) or not self.compare (arg2, against)):
 
                 arg1 = TypingVisitor.describe (arg1)
                 arg2 = TypingVisitor.describe (arg2)
@@ -147,7 +181,7 @@ class TypingVisitor:
 
           case '+' | '-' | '*' | '/' | '%' | '<' | '>' | '<=' | '>=':
 
-            if not (Type.compare_types (arg1, NUMBER_TYPE) and Type.compare_types (arg2, NUMBER_TYPE)):
+            if not (self.compare (arg1, NUMBER_TYPE) and self.compare (arg2, NUMBER_TYPE)):
 
               arg1 = TypingVisitor.describe (arg1)
               arg2 = TypingVisitor.describe (arg2)
@@ -191,6 +225,8 @@ class TypingVisitor:
 
     else:
 
+      self.depend (type_)
+
       if (member := type_.get (node.field, None)) == None:
 
         raise SemanticException (node, f'trying to access a no existing field \'{node.field}\' in \'{TypingVisitor.describe (type_)}\'')
@@ -205,7 +241,7 @@ class TypingVisitor:
 
     done, type_ = self.visit (node.condition, scope, types, prefix = prefix) # type: ignore
 
-    if type_ != BOOLEAN_TYPE:
+    if not Type.compare_types (BOOLEAN_TYPE, type_, strict = True):
 
       raise SemanticException (node.condition, f'conditional value is not a \'{TypingVisitor.describe (BOOLEAN_TYPE)}\' value')
 
@@ -219,7 +255,7 @@ class TypingVisitor:
         last, reverse = self.visit (node.reverse, scope, types, prefix = prefix) # type: ignore
         done = last + done
 
-        if not Type.compare_types (direct, reverse):
+        if not self.compare (direct, reverse):
 
           raise SemanticException (node.reverse, f'branch value type \'{reverse}\' differs from conditional type \'{direct}\'')
 
@@ -242,7 +278,7 @@ class TypingVisitor:
     last2, value = self.visit (node.value, scope, types, prefix = prefix) # type: ignore
     done = last1 + last2
 
-    if not Type.compare_types (over, value): # type: ignore
+    if not self.compare (over, value): # type: ignore
 
       raise SemanticException (node.over, f'can not assign a \'{TypingVisitor.describe (value)}\' value to a \'{TypingVisitor.describe (over)}\' variable') # type: ignore
 
@@ -254,11 +290,13 @@ class TypingVisitor:
     done = 0
     name = '.'.join ([ *map (lambda a: a.name, prefix), node.name ])
 
-    descent = Scope ()
+    descent = Scope (scope)
     params = OrderedDict ()
 
     value: FunctionType = scope [name] # type: ignore
 
+    self.writes.add (name)
+
     if len (prefix) > 0:
 
       descent [SELF_NAME if node.name == CTOR_NAME else SELF_VARIABLE] = (overlord := prefix [-1])
@@ -267,10 +305,6 @@ class TypingVisitor:
 
         descent [BASE_NAME if node.name == CTOR_NAME else BASE_VARIABLE] = overlord.parent
 
-    for name, type_ in scope.items ():
-
-      descent [name] = type_
-
     for name, param in value.params.items ():
 
       last, type_ = TypingVisitor.derivate (param, types, [])
@@ -293,7 +327,7 @@ class TypingVisitor:
       last, type_ = self.visit (node.body, descent, types, prefix = prefix) # type: ignore
       done, type_ = TypingVisitor.merge (value.type_, done + last, types, [ type_ ])
 
-      if not Type.compare_types (value.type_, type_):
+      if not self.compare (value.type_, type_):
 
         expect = TypingVisitor.describe (type_)
         got = TypingVisitor.describe (value.type_)
@@ -321,7 +355,14 @@ class TypingVisitor:
     arguments = descent [1:]
     target = descent [0]
 
-    if not isinstance (target, FunctionType):
+    # A wildcard's arity is not known, so calling one can not be checked
+    # beyond its arguments, which were typed above
+    #
+    if isinstance (target, WildcardType):
+
+      return (done, target)
+
+    elif not isinstance (target, FunctionType):
 
       raise SemanticException (node, f'attempt to call a \'{TypingVisitor.describe (target)}\' value')
 
@@ -329,11 +370,11 @@ class TypingVisitor:
 
       raise SemanticException (node, f'{target.name} function have {len (target.params)} arguments, got {len (arguments)}')
     
-    elif any ([ not Type.compare_types (a, b) for a, b in zip (arguments, target.params.values ()) ]):
+    elif any ([ not self.compare (a, b) for a, b in zip (arguments, target.params.values ()) ]):
 
       for typea, typeb in zip (arguments, target.params.values ()):
 
-        if not Type.compare_types (typea, typeb):
+        if not self.compare (typea, typeb):
 
           raise SemanticException (node, f'can not convert a \'{TypingVisitor.describe (typea)}\' value to a \'{TypingVisitor.describe (typeb)}\' type')
 
@@ -344,13 +385,9 @@ class TypingVisitor:
   @visitor.when (Let)
   def visit (self, node: Let, scope: Scope, types: Types, prefix: List[CompositeType] = []) -> TypeReport: # type: ignore
 
-    descent = Scope ()
+    descent = Scope (scope)
     done = 0
 
-    for name, variable in scope.items ():
-
-      descent [name] = variable
-
     for param in node.params:
 
       last, descent [param.name] = self.visit (param, descent, types, prefix = prefix) # type: ignore
@@ -383,7 +420,10 @@ class TypingVisitor:
     node.type_ = type_
 
     arguments: List[Type] = []
-    ctor: FunctionType = scope ['.'.join ([ type_.name, CTOR_NAME ])] # type: ignore
+    ctor: FunctionType = scope [ctorname := '.'.join ([ type_.name, CTOR_NAME ])] # type: ignore
+
+    self.depend (type_)
+    self.reads.add (ctorname)
     done: int = 0
 
     for other in node.arguments:
@@ -393,11 +433,11 @@ class TypingVisitor:
       arguments.append (down)
       done = done + last
 
-    if any ([ not Type.compare_types (a, b) for a, b in zip (arguments, ctor.params.values ()) ]):
+    if any ([ not self.compare (a, b) for a, b in zip (arguments, ctor.params.values ()) ]):
 
       for typea, typeb in zip (arguments, ctor.params.values ()):
 
-        if not Type.compare_types (typea, typeb):
+        if not self.compare (typea, typeb):
 
           raise SemanticException (node, f'can not convert a \'{TypingVisitor.describe (typea)}\' value to a \'{TypingVisitor.describe (typeb)}\' type')
 
@@ -413,6 +453,7 @@ class TypingVisitor:
       type_ = node.type_ or AnyType ()
     else:
 
+      self.writes.add (typekey (prefix [-1].name))
       type_ = prefix [-1].attributes [node.name]
 
     done, type_ = TypingVisitor.merge (type_, 0, types, [])
@@ -422,7 +463,7 @@ class TypingVisitor:
       last, value = self.visit (node.value, scope, types, prefix = prefix) # type: ignore
       done = last + done
 
-      if not Type.compare_types (type_, value):
+      if not self.compare (type_, value):
 
         raise SemanticException (node, f'can not assign a \'{TypingVisitor.describe (value)}\' value to a \'{TypingVisitor.describe (type_)}\' variable')
 
@@ -439,7 +480,7 @@ class TypingVisitor:
   @visitor.when (ProtocolDecl | TypeDecl)
   def visit (self, node: ProtocolDecl | TypeDecl, scope: Scope, types: Types, prefix: List[CompositeType] = []) -> TypeReport: # type: ignore
 
-    descent = Scope ()
+    descent = Scope (scope)
     parent: CompositeType = types.get (node.parent, None) # type: ignore
     value: CompositeType = types.get (node.name, None) # type: ignore
 
@@ -461,9 +502,8 @@ class TypingVisitor:
 
     value.parent = parent
 
-    for name, type_ in scope.items ():
-
-      descent [name] = type_
+    self.depend (parent)
+    self.writes.add (typekey (value.name))
 
     for name, type_ in [ *value.attributes.items (), *value.methods.items () ]:
 
@@ -480,7 +520,7 @@ class TypingVisitor:
 
         done, type_ = self.visit (node.argument, scope, types, prefix = prefix) # type: ignore
 
-        if type_ != BOOLEAN_TYPE:
+        if not Type.compare_types (BOOLEAN_TYPE, type_, strict = True):
 
           raise SemanticException (node, f'can not transform a \'{TypingVisitor.describe (type_)}\' to {TypingVisitor.describe (BOOLEAN_TYPE)}') # type: ignore
 
@@ -495,6 +535,8 @@ class TypingVisitor:
 
     name = node.name
 
+    self.reads.add (name)
+
     if not (type_ := scope.get (name, None)):
 
       raise SemanticException (node, f'unknown variable \'{node.name}\'')
@@ -0,0 +1,163 @@
+# Copyright 2021-2025
+# This file is part of HULK.
+#
+# HULK is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HULK is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HULK.  If not, see <http://www.gnu.org/licenses/>.
+#
+from parser.ast.base import AstNode
+from parser.ast.block import Block
+from semantic.scope import Scope
+from semantic.type import CompositeType, FunctionType, Type
+from semantic.types import Types
+from semantic.typing import ALL_TYPES, typekey, TypingVisitor
+from typing import Dict, List, Set, Tuple
+from utils.report import active, count, phase
+
+Entry = Tuple[List[object], None | str, int]
+
+NEVER: Entry = ([ ], None, -1)
+TYPE_PREFIX = typekey ('')
+
+def components (type_: None | Type) -> List[object]:
+
+  if isinstance (type_, FunctionType):
+
+    return [ type_, *type_.params.values (), type_.type_ ]
+
+  elif isinstance (type_, CompositeType):
+
+    members = [ components (member) for member in type_.methods.values () ]
+
+    return [ type_, type_.parent, *type_.attributes.values (), *[ part for parts in members for part in parts ] ]
+
+  return [ type_ ]
+
+def signature (type_: None | Type) -> str:
+
+  if isinstance (type_, FunctionType):
+
+    return f'{type_.name}({",".join ([ TypingVisitor.describe (param) for param in type_.params.values () ])}):{TypingVisitor.describe (type_.type_)}'
+
+  elif isinstance (type_, CompositeType):
+
+    attributes = [ f'{name}:{TypingVisitor.describe (member)}' for name, member in type_.attributes.items () ]
+    methods = [ f'{name}:{signature (member)}' for name, member in type_.methods.items () ]
+    parent = '' if type_.parent == None else type_.parent.name
+
+    return ';'.join ([ type_.name, parent, *attributes, *methods ])
+
+  return '' if type_ == None else TypingVisitor.describe (type_)
+
+def size (node: object) -> int:
+
+  if isinstance (node, list):
+
+    return sum ([ size (item) for item in node ])
+
+  elif isinstance (node, AstNode):
+
+    return 1 + sum ([ size (value) for value in vars (node).values () ])
+
+  return 0
+
+class Unit:
+
+  def __init__ (self, node: AstNode) -> None:
+
+    self.done = 0
+    self.node = node
+    self.reads: Set[str] = set ()
+    self.size = 0 if active () == None else size (node)
+    self.visited = -1
+    self.writes: Set[str] = set ()
+
+class TypingWorklist:
+
+  def __init__ (self, ast: AstNode, scope: Scope, types: Types) -> None:
+
+    self.scope = scope
+    self.table: Dict[str, Entry] = { }
+    self.time = 0
+    self.types = types
+    self.units = [ Unit (stmt) for stmt in (ast.stmts if isinstance (ast, Block) else [ ast ]) ]
+
+  def lookup (self, key: str) -> None | Type:
+
+    if key.startswith (TYPE_PREFIX):
+
+      return self.types.get (key [len (TYPE_PREFIX):], None)
+
+    return self.scope.get (key, None)
+
+  def refresh (self, unit: Unit) -> None:
+
+    types = False
+
+    for key in unit.writes:
+
+      parts = components (type_ := self.lookup (key))
+      last = self.table.get (key, NEVER)
+
+      if len (parts) != len (last [0]) or any ([ a is not b for a, b in zip (parts, last [0]) ]):
+
+        if (fingerprint := signature (type_)) != last [1]:
+
+          types = types or key.startswith (TYPE_PREFIX)
+          self.table [key] = (parts, fingerprint, self.time)
+        else:
+
+          self.table [key] = (parts, fingerprint, last [2])
+
+    if types:
+
+      self.table [ALL_TYPES] = ([ ], None, self.time)
+
+  def stale (self, unit: Unit) -> bool:
+
+    return unit.done > 0 or any ([ self.table.get (key, NEVER) [2] >= unit.visited for key in unit.reads ])
+
+  def run (self) -> None:
+
+    iteration = 0
+
+    while True:
+
+      with phase (f'TypingVisitor #{iteration}'):
+
+        done = 0
+
+        for unit in self.units:
+
+          if unit.visited >= 0 and not self.stale (unit):
+
+            count ('saved', unit.size)
+            continue
+
+          visitor = TypingVisitor ()
+
+          self.time = self.time + 1
+
+          unit.done, _ = visitor.visit (unit.node, self.scope, self.types) # type: ignore
+          unit.reads = visitor.reads
+          unit.writes = visitor.writes
+          unit.visited = self.time
+
+          self.refresh (unit)
+
+          count ('visits', unit.size)
+          done = done + unit.done
+
+        count ('done', done)
+
+      iteration = iteration + 1
+      if done == 0: break
@@ -14,19 +14,384 @@
  * You should have received a copy of the GNU General Public License
  * along with HULK.  If not, see <http://www.gnu.org/licenses/>.
  */
+#define _GNU_SOURCE
 #include <math.h>
+#include <pthread.h>
 #include <stdio.h>
 #include <string.h>
 #include <stdint.h>
 #include <stdlib.h>
+#include <time.h>
 
 typedef struct _Object Object;
 
 struct _Object
 {
   uint32_t typeid;
+  const void* vtable;
 };
 
+/* Memory */
+
+#define ARENA_SIZE (1 << 20)
+#define GC_THRESHOLD (8 << 20)
+#define SIZE_CLASSES 16
+#define SIZE_GRANULE 16
+
+#define SLOT_FREE 0
+#define SLOT_USED 1
+#define SLOT_MARKED 2
+
+typedef struct _Chunk Chunk;
+typedef struct _Free Free;
+typedef struct _GCStats GCStats;
+typedef struct _Gray Gray;
+typedef struct _Heap Heap;
+
+struct _Chunk
+{
+  char* start;
+  char* top;
+  char* end;
+  size_t slot;
+  int atomic;
+  unsigned char* state;
+};
+
+struct _Free
+{
+  Free* next;
+  Chunk* chunk;
+};
+
+struct _Gray
+{
+  Chunk* chunk;
+  const char* object;
+};
+
+struct _GCStats
+{
+  uint64_t collections;
+  uint64_t pause_total;
+  uint64_t pause_max;
+  uint64_t heap_size;
+  uint64_t heap_used;
+  uint64_t heap_limit;
+  uint64_t allocated;
+  uint64_t freed;
+};
+
+struct _Heap
+{
+  Chunk** chunks;
+  size_t count;
+  size_t capacity;
+
+  Chunk* arenas [2] [SIZE_CLASSES];
+  Free* free [2] [SIZE_CLASSES];
+
+  char* lowest;
+  char* highest;
+  char* stack;
+
+  size_t next;
+  Gray* gray;
+  size_t grays;
+  size_t gray_capacity;
+
+  int ready;
+  GCStats stats;
+};
+
+static Heap heap;
+
+static void out_of_memory (void)
+{
+  fputs ("out of memory\n", stderr);
+  abort ();
+}
+
+static void* checked (void* pointer)
+{
+  return (pointer == NULL ? (out_of_memory (), NULL) : pointer);
+}
+
+static uint64_t monotonic (void)
+{
+  struct timespec now;
+  return (clock_gettime (CLOCK_MONOTONIC, & now), (uint64_t) now.tv_sec * 1000000000 + now.tv_nsec);
+}
+
+static void heap_init (void)
+{
+  pthread_attr_t attr;
+  const char* limit;
+  size_t size;
+  void* stack;
+
+  pthread_getattr_np (pthread_self (), & attr);
+  pthread_attr_getstack (& attr, & stack, & size);
+  pthread_attr_destroy (& attr);
+
+  heap.stack = ((char*) stack) + size;
+  heap.next = GC_THRESHOLD;
+  heap.ready = 1;
+
+  if ((limit = getenv ("HULK_GC_LIMIT")) != NULL)
+    heap.stats.heap_limit = strtoull (limit, NULL, 10);
+}
+
+static Chunk* chunk_find (const char* pointer)
+{
+  size_t low = 0, high = heap.count;
+
+  if (pointer < heap.lowest || pointer >= heap.highest)
+    return NULL;
+
+  while (low < high)
+    {
+      size_t middle = (low + high) / 2;
+      Chunk* chunk = heap.chunks [middle];
+
+      if (pointer < chunk->start)
+        high = middle;
+      else if (pointer >= chunk->end)
+        low = middle + 1;
+      else
+        return chunk;
+    }
+  return NULL;
+}
+
+static Chunk* chunk_new (size_t size, size_t slot, int atomic)
+{
+  Chunk* chunk = checked (malloc (sizeof (Chunk)));
+  size_t at;
+
+  chunk->start = checked (calloc (1, size));
+  chunk->top = chunk->start;
+  chunk->end = chunk->start + size;
+  chunk->slot = slot;
+  chunk->atomic = atomic;
+  chunk->state = checked (calloc (size / slot, 1));
+
+  if (heap.count == heap.capacity)
+    {
+      heap.capacity = heap.capacity == 0 ? 64 : heap.capacity * 2;
+      heap.chunks = checked (realloc (heap.chunks, heap.capacity * sizeof (Chunk*)));
+    }
+
+  for (at = heap.count; at > 0 && heap.chunks [at - 1]->start > chunk->start; --at)
+    heap.chunks [at] = heap.chunks [at - 1];
+
+  heap.chunks [at] = chunk;
+  heap.count = heap.count + 1;
+
+  heap.lowest = heap.lowest == NULL || chunk->start < heap.lowest ? chunk->start : heap.lowest;
+  heap.highest = chunk->end > heap.highest ? chunk->end : heap.highest;
+  heap.stats.heap_size += size;
+  return chunk;
+}
+
+static void chunk_free (size_t at)
+{
+  Chunk* chunk = heap.chunks [at];
+
+  heap.stats.heap_size -= chunk->end - chunk->start;
+  memmove (& heap.chunks [at], & heap.chunks [at + 1], (heap.count - at - 1) * sizeof (Chunk*));
+  heap.count = heap.count - 1;
+
+  free (chunk->start);
+  free (chunk->state);
+  free (chunk);
+}
+
+static void mark (const char* pointer)
+{
+  Chunk* chunk;
+  size_t index;
+
+  if ((chunk = chunk_find (pointer)) == NULL || pointer >= chunk->top)
+    return;
+  if (chunk->state [index = (pointer - chunk->start) / chunk->slot] != SLOT_USED)
+    return;
+
+  chunk->state [index] = SLOT_MARKED;
+
+  if (chunk->atomic)
+    return;
+
+  if (heap.grays == heap.gray_capacity)
+    {
+      heap.gray_capacity = heap.gray_capacity == 0 ? 256 : heap.gray_capacity * 2;
+      heap.gray = checked (realloc (heap.gray, heap.gray_capacity * sizeof (Gray)));
+    }
+
+  heap.gray [heap.grays].chunk = chunk;
+  heap.gray [heap.grays].object = chunk->start + index * chunk->slot;
+  heap.grays = heap.grays + 1;
+}
+
+static void mark_range (const char* from, const char* to)
+{
+  const char* word;
+
+  for (word = from; word + sizeof (void*) <= to; word += sizeof (void*))
+    mark (* (char* const*) word);
+}
+
+static void __attribute__ ((noinline)) mark_frames (void)
+{
+  volatile uintptr_t here = (uintptr_t) & here;
+  mark_range ((const char*) (here & ~(sizeof (void*) - 1)), heap.stack);
+}
+
+static void __attribute__ ((noinline)) mark_stack (void)
+{
+  /* spill callee-saved registers so frames below see them */
+  __builtin_unwind_init ();
+  mark_frames ();
+}
+
+static void sweep (void)
+{
+  size_t at, index;
+
+  heap.stats.heap_used = 0;
+
+  for (at = heap.count; at-- > 0;)
+    {
+      Chunk* chunk = heap.chunks [at];
+      size_t slots = (chunk->top - chunk->start) / chunk->slot;
+
+      for (index = 0; index < slots; ++index)
+
+        switch (chunk->state [index])
+          {
+            case SLOT_MARKED:
+              chunk->state [index] = SLOT_USED;
+              heap.stats.heap_used += chunk->slot;
+              break;
+
+            case SLOT_USED:
+              chunk->state [index] = SLOT_FREE;
+              heap.stats.freed += chunk->slot;
+
+              if (chunk->slot == (size_t) (chunk->end - chunk->start))
+                chunk_free (at);
+              else
+                {
+                  size_t klass = chunk->slot / SIZE_GRANULE;
+                  Free* node = (Free*) (chunk->start + index * chunk->slot);
+
+                  node->next = heap.free [chunk->atomic] [klass];
+                  node->chunk = chunk;
+                  heap.free [chunk->atomic] [klass] = node;
+                }
+              break;
+          }
+    }
+}
+
+void gc_collect (void)
+{
+  uint64_t pause, start = monotonic ();
+
+  if (!heap.ready)
+    heap_init ();
+
+  mark_stack ();
+
+  while (heap.grays > 0)
+    {
+      Gray gray = heap.gray [heap.grays = heap.grays - 1];
+      mark_range (gray.object, gray.object + gray.chunk->slot);
+    }
+
+  sweep ();
+
+  heap.next = heap.stats.heap_used * 2 > GC_THRESHOLD ? heap.stats.heap_used * 2 : GC_THRESHOLD;
+  heap.stats.collections += 1;
+  heap.stats.pause_total += (pause = monotonic () - start);
+  heap.stats.pause_max = pause > heap.stats.pause_max ? pause : heap.stats.pause_max;
+}
+
+void gc_set_limit (size_t limit)
+{
+  if (!heap.ready)
+    heap_init ();
+
+  heap.stats.heap_limit = limit;
+}
+
+void gc_stats (GCStats* stats)
+{
+  * stats = heap.stats;
+}
+
+static void* gc_alloc (size_t size, int atomic)
+{
+  size_t klass = (size + SIZE_GRANULE - 1) / SIZE_GRANULE;
+  size_t rounded = (klass > 0 ? klass : (klass = 1)) * SIZE_GRANULE;
+  size_t limit;
+  Chunk* chunk;
+  char* object;
+  Free* node;
+
+  if (!heap.ready)
+    heap_init ();
+
+  limit = heap.stats.heap_limit;
+
+  if (heap.stats.heap_used + rounded > heap.next || (limit > 0 && heap.stats.heap_used + rounded > limit))
+    {
+      gc_collect ();
+
+      if (limit > 0 && heap.stats.heap_used + rounded > limit)
+        out_of_memory ();
+    }
+
+  heap.stats.allocated += rounded;
+  heap.stats.heap_used += rounded;
+
+  if (klass >= SIZE_CLASSES)
+    {
+      chunk = chunk_new (rounded, rounded, atomic);
+      chunk->top = chunk->end;
+      chunk->state [0] = SLOT_USED;
+      return chunk->start;
+    }
+
+  if ((node = heap.free [atomic] [klass]) != NULL)
+    {
+      heap.free [atomic] [klass] = node->next;
+      chunk = node->chunk;
+      object = memset (node, 0, rounded);
+    }
+  else
+    {
+      if ((chunk = heap.arenas [atomic] [klass]) == NULL || chunk->top + rounded > chunk->end)
+        heap.arenas [atomic] [klass] = (chunk = chunk_new (ARENA_SIZE, rounded, atomic));
+
+      object = chunk->top;
+      chunk->top += rounded;
+    }
+
+  chunk->state [(object - chunk->start) / rounded] = SLOT_USED;
+  return object;
+}
+
+void* object_alloc (size_t size)
+{
+  return gc_alloc (size, 0);
+}
+
+static char* string_alloc (size_t size)
+{
+  return gc_alloc (size, 1);
+}
+
 /* IO */
 
 int print_number_boolean (double n)
@@ -55,7 +420,7 @@ char* concat_string_string (const char* a, const char* b)
   int len1 = strlen (a);
   int len2 = strlen (b);
 
-  char* buf = malloc (len1 + len2 + 1);
+  char* buf = string_alloc (len1 + len2 + 1);
 
   memcpy (& buf [0], a, len1);
   memcpy (& buf [len1], b, len2);
@@ -63,16 +428,33 @@ char* concat_string_string (const char* a, const char* b)
   return (buf [len1 + len2] = '\0', buf);
 }
 
+char* string_build (size_t count, const char* const* parts)
+{
+  size_t lengths [count > 0 ? count : 1];
+  size_t i, at = 0, total = 0;
+  char* buf;
+
+  for (i = 0; i < count; ++i)
+    total += (lengths [i] = strlen (parts [i]));
+
+  buf = string_alloc (total + 1);
+
+  for (i = 0; i < count; at += lengths [i++])
+    memcpy (& buf [at], parts [i], lengths [i]);
+
+  return (buf [total] = '\0', buf);
+}
+
 char* sitos_number_string (double a)
 {
-  char* buf = malloc (27);
+  char* buf = string_alloc (27);
   return (sprintf (buf, "%lf%c", a, 0), buf);
 }
 
 char* sitos_string_string (const char* a)
 {
   int len = strlen (a);
-  char* buf = malloc (len + 1);
+  char* buf = string_alloc (len + 1);
   return (memcpy (buf, a, len), buf [len] = '\0', buf);
 }
 
@@ -0,0 +1,211 @@
+# Copyright 2021-2025
+# This file is part of HULK.
+#
+# HULK is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HULK is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HULK.  If not, see <http://www.gnu.org/licenses/>.
+#
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Generator, List
+import gc
+import json
+import resource
+import time
+
+__all__ = [ 'active', 'attach', 'count', 'phase', 'Phase', 'Report' ]
+
+_active: 'None | Report' = None
+
+class Phase:
+
+  def __init__ (self, name: str) -> None:
+
+    self.children: List[Phase] = [ ]
+    self.counters: Dict[str, int | float] = { }
+    self.cpu = 0.0
+    self.name = name
+    self.objects = 0
+    self.wall = 0.0
+
+    # How much the process' peak resident set grew while the phase ran,
+    # ru_maxrss only ever reports the peak over the whole process life
+    #
+    self.rss = 0
+
+  def as_dict (self) -> Dict[str, Any]:
+
+    return {
+
+      'name': self.name,
+      'wall': self.wall,
+      'cpu': self.cpu,
+      'rss': self.rss,
+      'objects': self.objects,
+      'counters': dict (self.counters),
+      'children': [ child.as_dict () for child in self.children ],
+    }
+
+  @staticmethod
+  def from_dict (data: Dict[str, Any]) -> 'Phase':
+
+    phase = Phase (data ['name'])
+
+    phase.wall = data ['wall']
+    phase.cpu = data ['cpu']
+    phase.rss = data ['rss']
+    phase.objects = data ['objects']
+    phase.counters = dict (data ['counters'])
+    phase.children = [ Phase.from_dict (child) for child in data ['children'] ]
+
+    return phase
+
+class Report:
+
+  def __init__ (self, name: str = 'total', objects: bool = False) -> None:
+
+    self.objects = objects
+    self.overhead = [ 0.0, 0.0 ]
+    self.root = Phase (name)
+    self.stack: List[Phase] = [ self.root ]
+    self._outer: None | Report = None
+    self._start = self._open ()
+
+  def __enter__ (self) -> 'Report':
+
+    global _active
+
+    self._outer, _active = _active, self
+    self._start = self._open ()
+
+    return self
+
+  def __exit__ (self, *exc) -> None:
+
+    global _active
+
+    self._close (self.root, self._start)
+    _active, self._outer = self._outer, None
+
+  def _count (self) -> int:
+
+    if not self.objects:
+
+      return 0
+
+    # Counting objects walks the whole heap, so it happens outside the
+    # timed window and the time it takes is kept out of enclosing phases
+    #
+    wall, cpu = time.perf_counter (), time.process_time ()
+    objects = len (gc.get_objects ())
+
+    self.overhead [0] = self.overhead [0] + time.perf_counter () - wall
+    self.overhead [1] = self.overhead [1] + time.process_time () - cpu
+
+    return objects
+
+  def _open (self) -> List[float]:
+
+    objects = self._count ()
+
+    return [ time.perf_counter (), time.process_time (), *self.overhead, objects, Report._peak () ]
+
+  def _close (self, phase: Phase, start: List[float]) -> None:
+
+    wall, cpu = time.perf_counter (), time.process_time ()
+
+    phase.wall = phase.wall + wall - start [0] - (self.overhead [0] - start [2])
+    phase.cpu = phase.cpu + cpu - start [1] - (self.overhead [1] - start [3])
+    phase.rss = phase.rss + max (0, Report._peak () - int (start [5]))
+    phase.objects = phase.objects + self._count () - int (start [4])
+
+  @staticmethod
+  def _peak () -> int:
+
+    return resource.getrusage (resource.RUSAGE_SELF).ru_maxrss * 1024
+
+  @contextmanager
+  def attach (self, phase: Phase) -> Generator[Phase, None, None]:
+
+    self.stack [-1].children.append (phase)
+    self.stack.append (phase)
+
+    try:
+
+      yield phase
+
+    finally:
+
+      self.stack.pop ()
+
+  def count (self, name: str, value: int | float = 1) -> None:
+
+    counters = self.stack [-1].counters
+    counters [name] = counters.get (name, 0) + value
+
+  @contextmanager
+  def phase (self, name: str) -> Generator[Phase, None, None]:
+
+    self.stack [-1].children.append (phase := Phase (name))
+    self.stack.append (phase)
+
+    start = self._open ()
+
+    try:
+
+      yield phase
+
+    finally:
+
+      self._close (phase, start)
+      self.stack.pop ()
+
+  def json (self) -> str:
+
+    return json.dumps (self.root.as_dict (), indent = 2)
+
+  def table (self) -> str:
+
+    header = f'{"phase":<48} {"wall (ms)":>12} {"cpu (ms)":>12} {"+rss (MiB)":>10} {"objects":>10}  counters'
+    lines = [ header, '-' * len (header) ]
+
+    def walk (phase: Phase, depth: int):
+
+      name = ('  ' * depth + phase.name) [:48]
+      counters = ', '.join ([ f'{key}={value:g}' for key, value in phase.counters.items () ])
+
+      lines.append (f'{name:<48} {phase.wall * 1000:>12.3f} {phase.cpu * 1000:>12.3f} {phase.rss / 1048576:>10.1f} {phase.objects if self.objects else "-":>10}  {counters}')
+
+      for child in phase.children:
+
+        walk (child, depth + 1)
+
+    walk (self.root, 0)
+
+    return '\n'.join (lines)
+
+def active () -> None | Report:
+
+  return _active
+
+def attach (phase: Phase):
+
+  return nullcontext () if _active == None else _active.attach (phase)
+
+def count (name: str, value: int | float = 1) -> None:
+
+  if _active != None:
+
+    _active.count (name, value)
+
+def phase (name: str):
+
+  return nullcontext () if _active == None else _active.phase (name)
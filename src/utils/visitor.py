@@ -53,23 +53,30 @@ class Dispatcher(object):
     self.param_index = self.__argspec(fn).args.index(param_name)
     self.param_name = param_name
     self.targets = {}
+    self.cache = {}
 
   def __call__(self, *args, **kw):
     typ = args[self.param_index].__class__
+    d = self.cache.get(typ)
+    if d is None:
+      d = self.cache[typ] = self.resolve(typ)
+    if len(d) == 1:
+      return d[0](*args, **kw)
+    return [f(*args, **kw) for f in d]
+
+  def resolve(self, typ):
+    # Matching targets are computed once per concrete class; an exact
+    # registration wins, otherwise every registered base class matches
     d = self.targets.get(typ)
     if d is not None:
-      return d(*args, **kw)
-    else:
-      issub = issubclass
-      t = self.targets
-      ks = t.keys()
-      ans = [t[k](*args, **kw) for k in ks if issub(typ, k)]
-      if len(ans) == 1:
-        return ans.pop()
-      return ans
+      return (d,)
+    issub = issubclass
+    t = self.targets
+    return tuple(t[k] for k in t.keys() if issub(typ, k))
 
   def add_target(self, typ, target):
     self.targets[typ] = target
+    self.cache.clear()
 
   @staticmethod
   def __argspec(fn):
@@ -0,0 +1,36 @@
+# Copyright 2021-2025
+# This file is part of HULK.
+#
+# HULK is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HULK is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HULK.  If not, see <http://www.gnu.org/licenses/>.
+#
+from parser.ast.base import AstNode
+from typing import Generator
+
+__all__ = [ 'nodes' ]
+
+def nodes (node: object) -> Generator[AstNode, None, None]:
+
+  if isinstance (node, list):
+
+    for item in node:
+
+      yield from nodes (item)
+
+  elif isinstance (node, AstNode):
+
+    yield node
+
+    for value in vars (node).values ():
+
+      yield from nodes (value)